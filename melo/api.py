@@ -1,29 +1,48 @@
 import os
 import re
 import json
+import hashlib
+import logging
+import itertools
 import torch
-import librosa
 import soundfile
-import torchaudio
 import numpy as np
 import torch.nn as nn
-from tqdm import tqdm
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 import torch
 
 from . import utils
 from . import commons
-from .models import SynthesizerTrn
+from .cache import make_key
+from .text import bert_registry, language_bert_model_id_map
 from .split_utils import split_sentence
-from .mel_processing import spectrogram_torch, spectrogram_torch_conv
 from .download_utils import load_or_download_config, load_or_download_model
 
+logger = logging.getLogger(__name__)
+
 class TTS(nn.Module):
     def __init__(self, 
                 language,
                 device='auto',
                 use_hf=True,
                 config_path=None,
-                ckpt_path=None):
+                ckpt_path=None,
+                feature_cache=None,
+                audio_cache=None,
+                compile=False,
+                compile_cache_dir=None,
+                length_bucket=32,
+                frame_bucket=256,
+                backend='torch',
+                onnx_dir=None,
+                quantize=None,
+                calibration_texts=None,
+                optimize=True,
+                drop_posterior_encoder=False,
+                dtype='fp32',
+                precision_policy=None,
+                bert_backend=None):
         super().__init__()
         if device == 'auto':
             device = 'cpu'
@@ -34,41 +53,178 @@ class TTS(nn.Module):
 
         # config_path = 
         hps = load_or_download_config(language, use_hf=use_hf, config_path=config_path)
+        # the BERT encoder runs as set by `bert_backend` in the data section of the config,
+        # unless overridden here
+        if bert_backend is not None:
+            hps.data.bert_backend = bert_backend
+        self.bert_backend = getattr(hps.data, 'bert_backend', 'torch')
 
-        num_languages = hps.num_languages
-        num_tones = hps.num_tones
         symbols = hps.symbols
 
-        model = SynthesizerTrn(
-            len(symbols),
-            hps.data.filter_length // 2 + 1,
-            hps.train.segment_size // hps.data.hop_length,
-            n_speakers=hps.data.n_speakers,
-            num_tones=num_tones,
-            num_languages=num_languages,
-            **hps.model,
-        ).to(device)
-
-        model.eval()
-        self.model = model
         self.symbol_to_id = {s: i for i, s in enumerate(symbols)}
         self.hps = hps
         self.device = device
-    
-        # load state_dict
-        checkpoint_dict = load_or_download_model(language, device, use_hf=use_hf, ckpt_path=ckpt_path)
-        self.model.load_state_dict(checkpoint_dict['model'], strict=True)
-        
+        self.feature_cache = feature_cache
+        self.audio_cache = audio_cache
+        self._model_checksum = None
+        assert backend in ['torch', 'onnxruntime'], f'Unknown backend {backend}'
+        self.backend = backend
+        self.quantization = None
+        self.precision_policy = None
+
+        if backend == 'onnxruntime':
+            # the acoustic model runs from the graphs written by `melo-export-onnx`,
+            # the checkpoint is not loaded
+            from .onnx_utils import OnnxSynthesizer
+
+            assert onnx_dir is not None, 'onnx_dir is required for the onnxruntime backend'
+            self.model = OnnxSynthesizer(onnx_dir)
+            self.length_bucket = 1
+            self.frame_bucket = 1
+        else:
+            # the acoustic model modules are only imported for the torch backend
+            from . import precision
+            from .compile_utils import compile_inference
+
+            # load state_dict
+            checkpoint_dict = load_or_download_model(language, device, use_hf=use_hf, ckpt_path=ckpt_path)
+            inference_only = checkpoint_dict.get('inference_only', False)
+            state_dict = checkpoint_dict['model']
+            if inference_only:
+                # slim checkpoints hold the weights of an already optimized model, upcast
+                # them if they were stored in a narrower dtype
+                assert optimize, 'inference-only checkpoints cannot be loaded with optimize=False'
+                state_dict = {k: v.float() if v.is_floating_point() else v for k, v in state_dict.items()}
+            self.model = self.build_model(hps, state_dict, device, inference_only=inference_only)
+            if optimize:
+                # the posterior encoder is kept for `voice_conversion` unless asked otherwise
+                self.model.optimize_for_inference(drop_posterior_encoder=drop_posterior_encoder)
+            assert dtype in precision.DTYPES, f'Unknown dtype {dtype}, use one of {list(precision.DTYPES)}'
+            if precision_policy is None and dtype != 'fp32':
+                precision_policy = precision.default_policy(dtype)
+            if precision_policy is not None:
+                precision.apply_precision_policy(self.model, precision_policy)
+                self.precision_policy = precision_policy
+            # the voices are fixed once loaded, precompute their conditioning of every module
+            self.model.cache_speaker_conditioning(hps.data.spk2id.values())
+
+            # compiled graphs are specialized on shapes, padding the phone axis to a multiple of
+            # `length_bucket` and the frame axis to a multiple of `frame_bucket` keeps the
+            # number of distinct input lengths small
+            self.length_bucket = length_bucket if compile else 1
+            self.frame_bucket = frame_bucket if compile else 1
+            if compile:
+                compile_inference(self.model, cache_dir=compile_cache_dir)
+
         language = language.split('_')[0]
         self.language = 'ZH_MIX_EN' if language == 'ZH' else language # we support a ZH_MIX_EN model
 
+        # BERT models are shared by every TTS instance in the process, hold a reference
+        # until `close`. The model is loaded by the first text front-end call, so the
+        # export commands, which never run it, do not load BERT
+        self.bert_model_id = None
+        if not getattr(hps.data, 'disable_bert', False):
+            self.bert_model_id = language_bert_model_id_map[self.language]
+            bert_registry.acquire(self.bert_model_id, device, backend=self.bert_backend)
+
+        if quantize is not None:
+            assert not compile, 'quantize and compile cannot be combined'
+            assert self.precision_policy is None, 'quantize and reduced precision cannot be combined'
+            self.quantize(quantize, calibration_texts)
+
+    def close(self):
+        """Release this instance's reference on its BERT model, which is unloaded once no
+        other instance uses it."""
+        if self.bert_model_id is not None:
+            bert_registry.release(self.bert_model_id, self.device, backend=self.bert_backend)
+            self.bert_model_id = None
+
+    @staticmethod
+    def build_model(hps, state_dict, device, inference_only=False, use_meta=True):
+        """Construct the `SynthesizerTrn` of `hps` holding the weights in `state_dict`.
+
+        The model is built on the meta device, which allocates and initializes nothing,
+        and the checkpoint tensors are then assigned as its parameters. Random weights and
+        the checkpoint are never resident together, and memory-mapped slim checkpoints
+        are not copied on CPU. If that fails, the model is built normally and the weights
+        are copied in.
+        """
+        from .models import SynthesizerTrn
+
+        def construct():
+            return SynthesizerTrn(
+                len(hps.symbols),
+                hps.data.filter_length // 2 + 1,
+                hps.train.segment_size // hps.data.hop_length,
+                n_speakers=hps.data.n_speakers,
+                num_tones=hps.num_tones,
+                num_languages=hps.num_languages,
+                **hps.model,
+            )
+
+        # slim checkpoints are written without the posterior encoder
+        drop_posterior_encoder = not any(k.startswith('enc_q.') for k in state_dict)
+        if use_meta:
+            try:
+                with torch.device('meta'):
+                    model = construct()
+                if inference_only:
+                    model.optimize_for_inference(drop_posterior_encoder=drop_posterior_encoder)
+                model.load_state_dict({k: v.to(device) for k, v in state_dict.items()}, strict=True, assign=True)
+                tensors = itertools.chain(model.named_parameters(), model.named_buffers())
+                missing = [name for name, tensor in tensors if tensor.is_meta]
+                assert not missing, f'not materialized by the checkpoint: {missing}'
+                return model.eval()
+            except Exception as e:
+                logger.warning(f'Building the model on the meta device failed, falling back to regular initialization: {e}')
+        model = construct().to(device)
+        if inference_only:
+            model.optimize_for_inference(drop_posterior_encoder=drop_posterior_encoder)
+        model.load_state_dict(state_dict, strict=True)
+        return model.eval()
+
+    def quantize(self, mode, calibration_texts):
+        """Quantize the decoder, which dominates CPU inference time, to static int8.
+
+        Activation ranges are calibrated by synthesizing `calibration_texts`, e.g. the
+        sentences in test/basetts_test_resources, cycling through the speakers.
+        """
+        assert mode == 'int8', f'Unknown quantization mode {mode}'
+        assert self.backend == 'torch' and self.device == 'cpu', 'int8 quantization is only supported on CPU'
+        assert calibration_texts, 'calibration_texts are required for int8 quantization'
+        from . import quantization
+
+        prepared = quantization.prepare_decoder(self.model.dec)
+        speaker_ids = list(self.hps.data.spk2id.values())
+        for i, text in enumerate(calibration_texts):
+            self.infer_batch([self.get_text_features(text)], [speaker_ids[i % len(speaker_ids)]])
+        quantization.convert_decoder(self.model.dec, prepared)
+        self.quantization = mode
+        self._model_checksum = None
+
+    @property
+    def model_checksum(self):
+        """SHA-1 over the loaded weights, computed on first use."""
+        if self._model_checksum is None and self.backend == 'onnxruntime':
+            self._model_checksum = self.model.checksum()
+        if self._model_checksum is None:
+            checksum = hashlib.sha1()
+            for name, tensor in self.model.state_dict().items():
+                checksum.update(name.encode('utf-8'))
+                checksum.update(tensor.detach().cpu().reshape(-1).view(torch.uint8).numpy().tobytes())
+            self._model_checksum = checksum.hexdigest()
+        return self._model_checksum
+
     @staticmethod
     def audio_numpy_concat(segment_data_list, sr, speed=1.):
-        audio_segments = []
+        silence_length = int((sr * 0.05) / speed)
+        total_length = sum(segment_data.size + silence_length for segment_data in segment_data_list)
+        audio_segments = np.zeros(total_length, dtype=np.float32)
+        offset = 0
         for segment_data in segment_data_list:
-            audio_segments += segment_data.reshape(-1).tolist()
-            audio_segments += [0] * int((sr * 0.05) / speed)
-        audio_segments = np.array(audio_segments).astype(np.float32)
+            segment_data = segment_data.reshape(-1)
+            audio_segments[offset:offset + segment_data.size] = segment_data
+            offset += segment_data.size + silence_length
         return audio_segments
 
     @staticmethod
@@ -80,51 +236,93 @@ class TTS(nn.Module):
             print(" > ===========================")
         return texts
 
-    def tts_to_file(self, text, speaker_id, output_path=None, sdp_ratio=0.2, noise_scale=0.6, noise_scale_w=0.8, speed=1.0, pbar=None, format=None, position=None, quiet=False,):
+    def tts_iter(self, text, speaker_id, sdp_ratio=0.2, noise_scale=0.6, noise_scale_w=0.8, speed=1.0, pbar=None, position=None, quiet=False, batch_size=1, dtype='float32', dec_chunk_size=None, pipeline_depth=0, seed=None):
+        """Synthesize `text` and yield the audio of each sentence as soon as it is ready.
+
+        Every chunk is a numpy array of the sentence followed by the inter-sentence silence,
+        so concatenating the chunks gives the same waveform as `tts_to_file`. `dtype` is
+        either 'float32' (range [-1, 1]) or 'int16' (PCM). `dec_chunk_size` decodes the
+        latent in windows of that many frames to bound the vocoder's activation memory;
+        with `batch_size=1` each window is yielded as soon as it is decoded, and the
+        silence follows the last one as its own chunk.
+        `pipeline_depth` > 0 runs the text front-end of upcoming sentences in a background
+        thread while the current one is synthesized.
+
+        Passing a `seed` makes the sampling noise, and therefore the audio, deterministic
+        for identical arguments. Seeded requests are served from `self.audio_cache`
+        without running the model when it holds them.
+        """
+        assert dtype in ['float32', 'int16'], dtype
+        generator = None
+        cache_key = None
+        if seed is not None:
+            generator = self._generator(seed)
+            if self.audio_cache is not None:
+                # the bucket sizes set the padded shapes the noise is drawn over, so they
+                # change the audio of a given seed
+                cache_key = make_key(self.model_checksum, self.quantization, self.bert_backend, self.length_bucket, self.frame_bucket, self.language, speaker_id, text, sdp_ratio, noise_scale, noise_scale_w, speed, seed, batch_size)
+                audio = self.audio_cache.get(cache_key)
+                if audio is not None:
+                    yield self._convert_audio(np.array(audio), dtype)
+                    return
         language = self.language
         texts = self.split_sentences_into_pieces(text, language, quiet)
-        audio_list = []
         if pbar:
             tx = pbar(texts)
         else:
+            from tqdm import tqdm
             if position:
                 tx = tqdm(texts, position=position)
             elif quiet:
                 tx = texts
             else:
                 tx = tqdm(texts)
-        for t in tx:
-            if language in ['EN', 'ZH_MIX_EN']:
-                t = re.sub(r'([a-z])([A-Z])', r'\1 \2', t)
-            device = self.device
-            bert, ja_bert, phones, tones, lang_ids = utils.get_text_for_tts_infer(t, language, self.hps, device, self.symbol_to_id)
-            with torch.no_grad():
-                x_tst = phones.to(device).unsqueeze(0)
-                tones = tones.to(device).unsqueeze(0)
-                lang_ids = lang_ids.to(device).unsqueeze(0)
-                bert = bert.to(device).unsqueeze(0)
-                ja_bert = ja_bert.to(device).unsqueeze(0)
-                x_tst_lengths = torch.LongTensor([phones.size(0)]).to(device)
-                del phones
-                speakers = torch.LongTensor([speaker_id]).to(device)
-                audio = self.model.infer(
-                        x_tst,
-                        x_tst_lengths,
-                        speakers,
-                        tones,
-                        lang_ids,
-                        bert,
-                        ja_bert,
-                        sdp_ratio=sdp_ratio,
-                        noise_scale=noise_scale,
-                        noise_scale_w=noise_scale_w,
-                        length_scale=1. / speed,
-                    )[0][0, 0].data.cpu().float().numpy()
-                del x_tst, tones, lang_ids, bert, ja_bert, x_tst_lengths, speakers
-                # 
-            audio_list.append(audio)
+        silence = np.zeros(int((self.hps.data.sampling_rate * 0.05) / speed), dtype=np.float32)
+        stream = bool(dec_chunk_size) and batch_size == 1 and self.backend == 'torch'
+        batch = []
+        cached_chunks = []
+        for i, features in enumerate(self.iter_text_features(tx, pipeline_depth, batch_size)):
+            batch.append(features)
+            if len(batch) < batch_size and i < len(texts) - 1:
+                continue
+            if stream:
+                # each decoded window is yielded as it is ready, followed by the silence
+                chunks = itertools.chain(self.infer_iter(batch[0], speaker_id, sdp_ratio=sdp_ratio, noise_scale=noise_scale, noise_scale_w=noise_scale_w, speed=speed, dec_chunk_size=dec_chunk_size, generator=generator), [silence])
+            else:
+                audio_list = self.infer_batch(batch, [speaker_id] * len(batch), sdp_ratio=sdp_ratio, noise_scale=noise_scale, noise_scale_w=noise_scale_w, speed=speed, dec_chunk_size=dec_chunk_size, generator=generator)
+                chunks = (np.concatenate([audio, silence]) for audio in audio_list)
+            batch = []
+            for chunk in chunks:
+                if cache_key is not None:
+                    cached_chunks.append(chunk)
+                yield self._convert_audio(chunk, dtype)
         torch.cuda.empty_cache()
-        audio = self.audio_numpy_concat(audio_list, sr=self.hps.data.sampling_rate, speed=speed)
+        if cache_key is not None:
+            self.audio_cache.put(cache_key, np.concatenate(cached_chunks) if cached_chunks else np.zeros(0, dtype=np.float32))
+
+    @staticmethod
+    def _convert_audio(audio, dtype):
+        if dtype == 'int16':
+            return (np.clip(audio, -1., 1.) * 32767).astype(np.int16)
+        return audio
+
+    def tts_to_file(self, text, speaker_id, output_path=None, sdp_ratio=0.2, noise_scale=0.6, noise_scale_w=0.8, speed=1.0, pbar=None, format=None, position=None, quiet=False, batch_size=1, dec_chunk_size=None, long_form=False, pipeline_depth=0, seed=None):
+        """Synthesize `text` and write it to `output_path`, or return it when no path is given.
+
+        With `long_form=True` each sentence is written to the open file as soon as it is
+        synthesized, so peak memory is bounded by the longest sentence instead of the
+        whole document.
+        """
+        chunks = self.tts_iter(text, speaker_id, sdp_ratio=sdp_ratio, noise_scale=noise_scale, noise_scale_w=noise_scale_w, speed=speed, pbar=pbar, position=position, quiet=quiet, batch_size=batch_size, dec_chunk_size=dec_chunk_size, pipeline_depth=pipeline_depth, seed=seed)
+        if long_form:
+            assert output_path is not None, 'long_form synthesis writes to output_path'
+            with soundfile.SoundFile(output_path, 'w', samplerate=self.hps.data.sampling_rate, channels=1, format=format) as f:
+                for chunk in chunks:
+                    f.write(chunk)
+            return
+
+        chunks = list(chunks)
+        audio = np.concatenate(chunks) if chunks else np.zeros(0, dtype=np.float32)
 
         if output_path is None:
             return audio
@@ -133,3 +331,215 @@ class TTS(nn.Module):
                 soundfile.write(output_path, audio, self.hps.data.sampling_rate, format=format)
             else:
                 soundfile.write(output_path, audio, self.hps.data.sampling_rate)
+
+    def tts_multi_speaker(self, text, speaker_ids, sdp_ratio=0.2, noise_scale=0.6, noise_scale_w=0.8, speed=1.0, quiet=False, batch_size=None, dec_chunk_size=None, pipeline_depth=0, seed=None):
+        """Synthesize the same `text` for several speakers and return one array per speaker.
+
+        The text front-end runs once per sentence; the speakers are stacked along the batch
+        dimension of `infer` (at most `batch_size` at a time) since only the speaker
+        embedding differs between them.
+        """
+        texts = self.split_sentences_into_pieces(text, self.language, quiet)
+        batch_size = batch_size or len(speaker_ids)
+        generator = self._generator(seed)
+        audio_lists = [[] for _ in speaker_ids]
+        for features in self.iter_text_features(texts, pipeline_depth):
+            for start in range(0, len(speaker_ids), batch_size):
+                sids = speaker_ids[start:start + batch_size]
+                audio_list = self.infer_batch([features] * len(sids), sids, sdp_ratio=sdp_ratio, noise_scale=noise_scale, noise_scale_w=noise_scale_w, speed=speed, dec_chunk_size=dec_chunk_size, generator=generator)
+                for i, audio in enumerate(audio_list):
+                    audio_lists[start + i].append(audio)
+        torch.cuda.empty_cache()
+        return [self.audio_numpy_concat(audio_list, sr=self.hps.data.sampling_rate, speed=speed) for audio_list in audio_lists]
+
+    def get_text_features(self, text):
+        return self.get_text_features_batch([text])[0]
+
+    def get_text_features_batch(self, texts):
+        """`get_text_features` of several texts, with one BERT forward for all of them."""
+        language = self.language
+        if language in ['EN', 'ZH_MIX_EN']:
+            texts = [re.sub(r'([a-z])([A-Z])', r'\1 \2', text) for text in texts]
+        return utils.get_text_for_tts_infer_batch(texts, language, self.hps, self.device, self.symbol_to_id, cache=self.feature_cache)
+
+    def iter_text_features(self, texts, pipeline_depth=0, batch_size=1):
+        """Yield `get_text_features` of each text in order.
+
+        The texts are prepared `batch_size` at a time with `get_text_features_batch`. With
+        `pipeline_depth` > 0, a single background thread prepares up to that many upcoming
+        batches while the caller consumes the current one, which hides the normalize/g2p/BERT
+        latency behind the acoustic model.
+        """
+        texts = iter(texts)
+        batches = iter(lambda: list(itertools.islice(texts, batch_size)), [])
+        if pipeline_depth <= 0:
+            for batch in batches:
+                yield from self.get_text_features_batch(batch)
+            return
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            pending = deque()
+            for batch in batches:
+                pending.append(executor.submit(self.get_text_features_batch, batch))
+                if len(pending) > pipeline_depth:
+                    yield from pending.popleft().result()
+            while pending:
+                yield from pending.popleft().result()
+
+    def warm_up(self, max_phones=256, max_frames=2048, batch_sizes=(1,)):
+        """Compile the graphs of every phone bucket up to `max_phones` and every frame bucket
+        up to `max_frames` for each of `batch_sizes`, so that no request pays for a
+        compilation. Only useful with `compile=True`."""
+        from .compile_utils import warm_up_frames
+
+        speaker_id = next(iter(self.hps.data.spk2id.values()))
+        for batch_size in batch_sizes:
+            for length in range(self.length_bucket, max_phones + 1, self.length_bucket):
+                phones = torch.ones(length, dtype=torch.long)
+                features = (None, None, phones, torch.zeros_like(phones), torch.zeros_like(phones), torch.ones_like(phones))
+                self.infer_batch([features] * batch_size, [speaker_id] * batch_size)
+            if self.frame_bucket > 1:
+                warm_up_frames(self.model, speaker_id, self.frame_bucket, max_frames, batch_sizes=[batch_size])
+
+    def infer_batch(self, features, speaker_ids, sdp_ratio=0.2, noise_scale=0.6, noise_scale_w=0.8, speed=1.0, dec_chunk_size=None, generator=None):
+        """Synthesize several sentences with a single `SynthesizerTrn.infer` call.
+
+        `features` is a list of (bert, ja_bert, phones, tones, lang_ids, word2ph) as returned
+        by `get_text_features`, `speaker_ids` holds one speaker id per item. The inputs are
+        zero-padded to the longest item and each waveform is cut back to the length of its
+        own `y_mask`. A `torch.Generator`, or a `numpy.random.Generator` for the onnxruntime
+        backend, makes the sampling noise reproducible. Returns a list of float32 numpy arrays.
+        """
+        if self.backend == 'onnxruntime':
+            return self._infer_batch_onnx(features, speaker_ids, sdp_ratio, noise_scale, noise_scale_w, speed, generator)
+        device = self.device
+        x_lengths, x_tst, tones, lang_ids = self._pad_features(features)
+        batch_size, max_length = x_tst.shape
+        with torch.no_grad():
+            bert_emb = self._bert_emb(features, x_lengths, max_length)
+            audio, _, y_mask, _ = self.model.infer(
+                    x_tst.to(device),
+                    torch.LongTensor(x_lengths).to(device),
+                    torch.LongTensor(speaker_ids).to(device),
+                    tones.to(device),
+                    lang_ids.to(device),
+                    None,
+                    None,
+                    sdp_ratio=sdp_ratio,
+                    noise_scale=noise_scale,
+                    noise_scale_w=noise_scale_w,
+                    length_scale=1. / speed,
+                    dec_chunk_size=dec_chunk_size,
+                    generator=generator,
+                    bert_emb=bert_emb,
+                    frame_bucket=self.frame_bucket,
+                )
+            audio_lengths = (y_mask.sum([1, 2]).long() * self.hps.data.hop_length).tolist()
+            audio = audio[:, 0].data.cpu().float().numpy()
+            del x_tst, tones, lang_ids, bert_emb, y_mask
+        return [audio[i, :audio_lengths[i]].copy() for i in range(batch_size)]
+
+    def _infer_batch_onnx(self, features, speaker_ids, sdp_ratio, noise_scale, noise_scale_w, speed, rng):
+        # numpy only: the front-end tensors are read as arrays, padded and expanded to phones,
+        # since the exported text encoder takes phone-level BERT features
+        x_lengths = [len(f[2]) for f in features]
+        batch_size, max_length = len(features), max(x_lengths)
+        x_tst = np.zeros((batch_size, max_length), dtype=np.int64)
+        tones = np.zeros((batch_size, max_length), dtype=np.int64)
+        lang_ids = np.zeros((batch_size, max_length), dtype=np.int64)
+        bert = np.zeros((batch_size, 1024, max_length), dtype=np.float32)
+        ja_bert = np.zeros((batch_size, 768, max_length), dtype=np.float32)
+        for i, (b, jb, ph, tn, lg, word2ph) in enumerate(features):
+            length = x_lengths[i]
+            x_tst[i, :length] = np.asarray(ph)
+            tones[i, :length] = np.asarray(tn)
+            lang_ids[i, :length] = np.asarray(lg)
+            word2ph = np.asarray(word2ph)
+            if b is not None:
+                bert[i, :, :length] = np.repeat(np.asarray(b, dtype=np.float32), word2ph, axis=1)
+            if jb is not None:
+                ja_bert[i, :, :length] = np.repeat(np.asarray(jb, dtype=np.float32), word2ph, axis=1)
+        audio, y_mask = self.model.infer(
+                x_tst,
+                np.array(x_lengths),
+                np.array(speaker_ids),
+                tones,
+                lang_ids,
+                bert,
+                ja_bert,
+                sdp_ratio=sdp_ratio,
+                noise_scale=noise_scale,
+                noise_scale_w=noise_scale_w,
+                length_scale=1. / speed,
+                rng=rng,
+            )
+        audio_lengths = (y_mask.sum((1, 2)).astype(np.int64) * self.hps.data.hop_length).tolist()
+        return [audio[i, 0, :audio_lengths[i]].copy() for i in range(batch_size)]
+
+    def _generator(self, seed):
+        """Source of the sampling noise of a seeded request, a numpy one for the
+        onnxruntime graphs."""
+        if seed is None:
+            return None
+        if self.backend == 'onnxruntime':
+            return np.random.default_rng(seed)
+        return torch.Generator().manual_seed(seed)
+
+    def infer_iter(self, features, speaker_id, sdp_ratio=0.2, noise_scale=0.6, noise_scale_w=0.8, speed=1.0, dec_chunk_size=32, generator=None):
+        """Synthesize one sentence and yield its audio as each window of `dec_chunk_size`
+        latent frames is vocoded, so playback can start before the whole sentence is
+        decoded. The concatenated chunks match `infer_batch` up to float error. Only the
+        torch backend decodes in windows.
+        """
+        assert self.backend == 'torch', 'infer_iter needs the torch backend'
+        device = self.device
+        x_lengths, x_tst, tones, lang_ids = self._pad_features([features])
+        with torch.no_grad():
+            bert_emb = self._bert_emb([features], x_lengths, x_tst.size(1))
+            z, _, y_mask, g, _ = self.model.infer_latent(
+                    x_tst.to(device),
+                    torch.LongTensor(x_lengths).to(device),
+                    torch.LongTensor([speaker_id]).to(device),
+                    tones.to(device),
+                    lang_ids.to(device),
+                    None,
+                    None,
+                    sdp_ratio=sdp_ratio,
+                    noise_scale=noise_scale,
+                    noise_scale_w=noise_scale_w,
+                    length_scale=1. / speed,
+                    generator=generator,
+                    bert_emb=bert_emb,
+                    frame_bucket=self.frame_bucket,
+                )
+            # a single sentence decodes without a mask once the padded frames are cut off
+            z = z[:, :, :int(y_mask.sum())]
+            for o in self.model.dec.iter_chunks(z, g=g, chunk_size=dec_chunk_size):
+                yield o[0, 0].data.cpu().float().numpy()
+
+    def _pad_features(self, features):
+        """Phone lengths and the phones, tones and language ids zero-padded to the longest
+        item, rounded up to `length_bucket`."""
+        x_lengths = [f[2].size(0) for f in features]
+        max_length = -(-max(x_lengths) // self.length_bucket) * self.length_bucket
+        x_tst = torch.zeros(len(features), max_length, dtype=torch.long)
+        tones = torch.zeros(len(features), max_length, dtype=torch.long)
+        lang_ids = torch.zeros(len(features), max_length, dtype=torch.long)
+        for i, (_, _, ph, tn, lg, _) in enumerate(features):
+            length = x_lengths[i]
+            x_tst[i, :length] = ph
+            tones[i, :length] = tn
+            lang_ids[i, :length] = lg
+        return x_lengths, x_tst, tones, lang_ids
+
+    def _bert_emb(self, features, x_lengths, max_length):
+        # the BERT projections run on the tokens, before the expansion to phones
+        device = self.device
+        enc_p = self.model.enc_p
+        bert_emb = torch.zeros(len(features), enc_p.hidden_channels, max_length, device=device)
+        for i, (b, jb, _, _, _, word2ph) in enumerate(features):
+            bert_emb[i, :, :x_lengths[i]] = enc_p.project_bert(
+                None if b is None else b.to(device),
+                None if jb is None else jb.to(device),
+                word2ph.to(device),
+            )
+        return bert_emb
@@ -100,8 +100,7 @@ class Encoder(nn.Module):
         x = x * x_mask
         for i in range(self.n_layers):
             if i == self.cond_layer_idx and g is not None:
-                g = self.spk_emb_linear(g.transpose(1, 2))
-                g = g.transpose(1, 2)
+                g = commons.speaker_projection(self, g)
                 x = x + g
                 x = x * x_mask
             y = self.attn_layers[i](x, x, attn_mask)
@@ -114,6 +113,10 @@ class Encoder(nn.Module):
         x = x * x_mask
         return x
 
+    def project_speaker(self, g):
+        g = self.spk_emb_linear(g.transpose(1, 2))
+        return g.transpose(1, 2)
+
 
 class Decoder(nn.Module):
     def __init__(
@@ -335,18 +338,14 @@ class MultiHeadAttention(nn.Module):
         return ret
 
     def _get_relative_embeddings(self, relative_embeddings, length):
-        2 * self.window_size + 1
-        # Pad first before slice to avoid using cond ops.
-        pad_length = max(length - (self.window_size + 1), 0)
-        slice_start_position = max((self.window_size + 1) - length, 0)
+        # Pad by `length` on both sides, without max() or cond ops on the length, so that
+        # traced graphs (ONNX export) stay valid for every sequence length.
+        padded_relative_embeddings = F.pad(
+            relative_embeddings,
+            commons.convert_pad_shape([[0, 0], [length, length], [0, 0]]),
+        )
+        slice_start_position = self.window_size + 1
         slice_end_position = slice_start_position + 2 * length - 1
-        if pad_length > 0:
-            padded_relative_embeddings = F.pad(
-                relative_embeddings,
-                commons.convert_pad_shape([[0, 0], [pad_length, pad_length], [0, 0]]),
-            )
-        else:
-            padded_relative_embeddings = relative_embeddings
         used_relative_embeddings = padded_relative_embeddings[
             :, slice_start_position:slice_end_position
         ]
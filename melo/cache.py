@@ -0,0 +1,144 @@
+import os
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import torch
+
+
+def make_key(*parts):
+    return hashlib.sha1(repr(parts).encode('utf-8')).hexdigest()
+
+
+class LRUCache(object):
+    """In-memory LRU bounded by `max_bytes`, backed by an optional on-disk tier.
+
+    The disk tier stores one file per entry in `cache_dir` and is never evicted; entries
+    read back from disk are promoted into memory. Subclasses define how values are sized,
+    saved and loaded.
+    """
+
+    suffix = '.bin'
+
+    def __init__(self, max_bytes=256 * 1024 * 1024, cache_dir=None):
+        self.max_bytes = max_bytes
+        self.cache_dir = cache_dir
+        if cache_dir is not None:
+            os.makedirs(cache_dir, exist_ok=True)
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key][0]
+        if self.cache_dir is not None and os.path.exists(self._path(key)):
+            value = self._load(self._path(key))
+            with self._lock:
+                self.disk_hits += 1
+            self._put_memory(key, value)
+            return value
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key, value):
+        self._put_memory(key, value)
+        if self.cache_dir is not None:
+            path = self._path(key)
+            tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+            self._save(tmp_path, value)
+            os.replace(tmp_path, path)
+
+    def invalidate(self):
+        """Drop every entry from memory and disk, e.g. after the checkpoint or config changed."""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+        if self.cache_dir is not None:
+            for name in os.listdir(self.cache_dir):
+                if name.endswith(self.suffix):
+                    os.remove(os.path.join(self.cache_dir, name))
+
+    def stats(self):
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+            }
+
+    def _put_memory(self, key, value):
+        nbytes = self._nbytes(value)
+        if nbytes > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._bytes -= self._entries.pop(key)[1]
+            self._entries[key] = (value, nbytes)
+            self._bytes += nbytes
+            while self._bytes > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self._bytes -= evicted
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key + self.suffix)
+
+    def _nbytes(self, value):
+        raise NotImplementedError()
+
+    def _save(self, path, value):
+        raise NotImplementedError()
+
+    def _load(self, path):
+        raise NotImplementedError()
+
+
+class FeatureCache(LRUCache):
+    """Cache of text front-end features, the (bert, ja_bert, phones, tones, lang_ids, word2ph)
+    tensors returned by `utils.get_text_for_tts_infer`, keyed per normalized sentence.
+    The unused BERT features are None and are not stored."""
+
+    suffix = '.npz'
+
+    def _nbytes(self, value):
+        return sum(t.element_size() * t.numel() for t in value if t is not None)
+
+    def _save(self, path, value):
+        with open(path, 'wb') as f:
+            np.savez(f, length=len(value), **{f'arr_{i}': t.numpy() for i, t in enumerate(value) if t is not None})
+
+    def _load(self, path):
+        with np.load(path) as data:
+            return tuple(
+                torch.from_numpy(data[f'arr_{i}']) if f'arr_{i}' in data.files else None
+                for i in range(int(data['length']))
+            )
+
+
+class AudioCache(LRUCache):
+    """Cache of synthesized waveforms for seeded, and therefore deterministic, requests.
+
+    Disk entries are plain .npy files that are memory-mapped when read back.
+    """
+
+    suffix = '.npy'
+
+    def _nbytes(self, value):
+        return value.nbytes
+
+    def _save(self, path, value):
+        with open(path, 'wb') as f:
+            np.save(f, value)
+
+    def _load(self, path):
+        return np.load(path, mmap_mode='r')
@@ -3,6 +3,35 @@ import torch
 from torch.nn import functional as F
 
 
+class SpeakerConditioning(object):
+    """Speaker embedding `g` together with precomputed speaker projections.
+
+    It is passed in place of `g`; every conditioned module looks up its own projection
+    in `projections` (see `speaker_projection`) instead of recomputing it per call.
+    """
+
+    def __init__(self, g, projections):
+        self.g = g
+        self.projections = projections
+
+    @staticmethod
+    def cat(conditionings):
+        """Stack per-speaker conditionings along the batch dimension."""
+        return SpeakerConditioning(
+            torch.cat([c.g for c in conditionings], 0),
+            {m: torch.cat([c.projections[m] for c in conditionings], 0) for m in conditionings[0].projections},
+        )
+
+
+def speaker_projection(module, g):
+    if isinstance(g, SpeakerConditioning):
+        projection = g.projections.get(module)
+        if projection is not None:
+            return projection
+        g = g.g
+    return module.project_speaker(g)
+
+
 def init_weights(m, mean=0.0, std=0.01):
     classname = m.__class__.__name__
     if classname.find("Conv") != -1:
@@ -34,6 +63,13 @@ def kl_divergence(m_p, logs_p, m_q, logs_q):
     return kl
 
 
+def randn_like(x, generator=None):
+    """torch.randn_like that can draw from an explicit (CPU) generator for reproducibility."""
+    if generator is None:
+        return torch.randn_like(x)
+    return torch.randn(x.size(), generator=generator).to(device=x.device, dtype=x.dtype)
+
+
 def rand_gumbel(shape):
     """Sample from the Gumbel distribution, protect from overflows."""
     uniform_samples = torch.rand(shape) * 0.99998 + 0.00001
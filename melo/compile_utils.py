@@ -0,0 +1,72 @@
+import os
+import logging
+
+import torch
+
+logger = logging.getLogger(__name__)
+
+# sub-networks of SynthesizerTrn run by `infer`, each compiled as its own graph
+INFERENCE_MODULES = ['enc_p', 'sdp', 'dp', 'flow', 'dec']
+
+
+class CompiledForward(object):
+    """Drop-in replacement of a module's `forward` that runs it through `torch.compile`.
+
+    If compiling or running the compiled graph raises, a warning is logged and the module
+    falls back to its eager `forward` for the rest of the process.
+    """
+
+    def __init__(self, module, name, **compile_kwargs):
+        self.name = name
+        self.eager = module.forward
+        self.compiled = torch.compile(self.eager, **compile_kwargs)
+        self.failed = False
+
+    def __call__(self, *args, **kwargs):
+        if not self.failed:
+            try:
+                return self.compiled(*args, **kwargs)
+            except Exception as e:
+                logger.warning(f'torch.compile of {self.name} failed, falling back to eager: {e}')
+                self.failed = True
+        return self.eager(*args, **kwargs)
+
+
+def compile_inference(model, cache_dir=None, mode=None, dynamic=True):
+    """Compile the encoder, duration predictors, flow and decoder of a `SynthesizerTrn`.
+
+    `forward` is replaced on the instances only, so the state dict and the eager class
+    are untouched. Graphs are compiled with dynamic sequence lengths on first use and,
+    with the inductor FX graph cache, stored under `cache_dir` so later processes load
+    them instead of recompiling. The cache directory must be set before the first
+    compilation in the process.
+    """
+    if cache_dir is not None:
+        os.makedirs(cache_dir, exist_ok=True)
+        os.environ['TORCHINDUCTOR_CACHE_DIR'] = cache_dir
+    try:
+        import torch._inductor.config
+        torch._inductor.config.fx_graph_cache = True
+    except (ImportError, AttributeError):
+        pass
+    for name in INFERENCE_MODULES:
+        module = getattr(model, name)
+        if isinstance(module.forward, CompiledForward):
+            continue
+        module.forward = CompiledForward(module, name, mode=mode, dynamic=dynamic)
+    return model
+
+
+def warm_up_frames(model, speaker_id, frame_bucket, max_frames, batch_sizes=(1,)):
+    """Run the flow and the decoder of `model` once on every multiple of `frame_bucket` up
+    to `max_frames`, as `SynthesizerTrn.infer` calls them, so that their graphs are compiled
+    before the first request of that length."""
+    device = model.emb_g.weight.device
+    with torch.no_grad():
+        for batch_size in batch_sizes:
+            g = model.speaker_conditioning(torch.LongTensor([speaker_id] * batch_size).to(device))
+            for length in range(frame_bucket, max_frames + 1, frame_bucket):
+                z_p = torch.randn(batch_size, model.inter_channels, length, device=device)
+                y_mask = torch.ones(batch_size, 1, length, device=device)
+                z = model.flow(z_p, y_mask, g=g, reverse=True)
+                model.dec(z * y_mask, g=g, x_mask=y_mask)
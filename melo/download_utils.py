@@ -1,8 +1,6 @@
 import torch
 import os
 from . import utils
-from cached_path import cached_path
-from huggingface_hub import hf_hub_download
 
 DOWNLOAD_CKPT_URLS = {
     'EN': 'https://myshell-public-repo-host.s3.amazonaws.com/openvoice/basespeakers/EN/checkpoint.pth',
@@ -46,9 +44,11 @@ def load_or_download_config(locale, use_hf=True, config_path=None):
         language = locale.split('-')[0].upper()
         if use_hf:
             assert language in LANG_TO_HF_REPO_ID
+            from huggingface_hub import hf_hub_download
             config_path = hf_hub_download(repo_id=LANG_TO_HF_REPO_ID[language], filename="config.json")
         else:
             assert language in DOWNLOAD_CONFIG_URLS
+            from cached_path import cached_path
             config_path = cached_path(DOWNLOAD_CONFIG_URLS[language])
     return utils.get_hparams_from_file(config_path)
 
@@ -57,11 +57,25 @@ def load_or_download_model(locale, device, use_hf=True, ckpt_path=None):
         language = locale.split('-')[0].upper()
         if use_hf:
             assert language in LANG_TO_HF_REPO_ID
+            from huggingface_hub import hf_hub_download
             ckpt_path = hf_hub_download(repo_id=LANG_TO_HF_REPO_ID[language], filename="checkpoint.pth")
         else:
             assert language in DOWNLOAD_CKPT_URLS
+            from cached_path import cached_path
             ckpt_path = cached_path(DOWNLOAD_CKPT_URLS[language])
+    if ckpt_path.endswith('.safetensors'):
+        return load_slim_checkpoint(ckpt_path)
     return torch.load(ckpt_path, map_location=device)
 
+def load_slim_checkpoint(ckpt_path):
+    """Load an inference-only checkpoint written by `melo-export-slim`.
+
+    safetensors maps the file and the CPU tensors point into the mapping without a copy,
+    so processes loading the same file share its page-cache pages.
+    """
+    from safetensors.torch import load_file
+    return {'model': load_file(ckpt_path, device='cpu'), 'inference_only': True}
+
 def load_pretrain_model():
+    from cached_path import cached_path
     return [cached_path(url) for url in PRETRAINED_MODELS.values()]
@@ -0,0 +1,40 @@
+import os
+import click
+
+
+def export_slim_checkpoint(model, output_path, fp16=False):
+    """Write the inference weights of `model` as safetensors.
+
+    The model is optimized for inference first, so the file holds folded weight norm and
+    no posterior encoder. With `fp16` the floating point weights are stored in half
+    precision, halving the file, at the cost of a conversion copy when loading.
+    """
+    from safetensors.torch import save_file
+
+    model.optimize_for_inference(drop_posterior_encoder=True)
+    state_dict = {}
+    for name, tensor in model.state_dict().items():
+        tensor = tensor.detach().cpu()
+        if fp16 and tensor.is_floating_point():
+            tensor = tensor.half()
+        state_dict[name] = tensor.contiguous()
+    save_file(state_dict, output_path, metadata={'format': 'pt', 'inference_only': 'true'})
+
+
+@click.command()
+@click.option('--language', '-l', default='EN', help='Language of the checkpoint, defaults to EN')
+@click.option('--output_path', '-o', required=True, help='Path of the .safetensors file to write')
+@click.option('--ckpt_path', '-c', default=None, help='Path to the checkpoint, downloaded if not given')
+@click.option('--config_path', default=None, help='Path to the config, downloaded if not given')
+@click.option('--fp16', is_flag=True, help='Store the weights in half precision')
+def main(language, output_path, ckpt_path, config_path, fp16):
+    from melo.api import TTS
+
+    assert output_path.endswith('.safetensors'), 'the output path must end with .safetensors'
+    model = TTS(language=language, device='cpu', config_path=config_path, ckpt_path=ckpt_path)
+    export_slim_checkpoint(model.model, output_path, fp16=fp16)
+    print(f'Wrote {output_path} ({os.path.getsize(output_path) / 2 ** 20:.1f}MB)')
+
+
+if __name__ == "__main__":
+    main()
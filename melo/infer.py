@@ -1,5 +1,6 @@
 import os
 import click
+import soundfile
 from melo.api import TTS
 
     
@@ -16,10 +17,12 @@ def main(ckpt_path, text, language, output_dir):
     config_path = os.path.join(os.path.dirname(ckpt_path), 'config.json')
     model = TTS(language=language, config_path=config_path, ckpt_path=ckpt_path)
     
-    for spk_name, spk_id in model.hps.data.spk2id.items():
+    spk2id = model.hps.data.spk2id
+    audios = model.tts_multi_speaker(text, list(spk2id.values()))
+    for spk_name, audio in zip(spk2id.keys(), audios):
         save_path = f'{output_dir}/{spk_name}/output.wav'
         os.makedirs(os.path.dirname(save_path), exist_ok=True)
-        model.tts_to_file(text, spk_id, save_path)
+        soundfile.write(save_path, audio, model.hps.data.sampling_rate)
 
 if __name__ == "__main__":
     main()
@@ -33,4 +33,4 @@ def main(text, file, output_path, language, speaker, speed, device):
         spkr = speaker_ids[speaker]
     else:
         spkr = speaker_ids[list(speaker_ids.keys())[0]]
-    model.tts_to_file(text, spkr, output_path, speed=speed)
+    model.tts_to_file(text, spkr, output_path, speed=speed, long_form=True)
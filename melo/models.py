@@ -11,7 +11,6 @@ from torch.nn import Conv1d, ConvTranspose1d, Conv2d
 from torch.nn.utils import weight_norm, remove_weight_norm, spectral_norm
 
 from melo.commons import init_weights, get_padding
-import melo.monotonic_align as monotonic_align
 
 
 class DurationDiscriminator(nn.Module):  # vits2
@@ -203,12 +202,14 @@ class StochasticDurationPredictor(nn.Module):
         if gin_channels != 0:
             self.cond = nn.Conv1d(gin_channels, filter_channels, 1)
 
-    def forward(self, x, x_mask, w=None, g=None, reverse=False, noise_scale=1.0):
+    def project_speaker(self, g):
+        return self.cond(torch.detach(g))
+
+    def forward(self, x, x_mask, w=None, g=None, reverse=False, noise_scale=1.0, generator=None, noise=None):
         x = torch.detach(x)
         x = self.pre(x)
         if g is not None:
-            g = torch.detach(g)
-            x = x + self.cond(g)
+            x = x + commons.speaker_projection(self, g)
         x = self.convs(x, x_mask)
         x = self.proj(x) * x_mask
 
@@ -254,10 +255,9 @@ class StochasticDurationPredictor(nn.Module):
         else:
             flows = list(reversed(self.flows))
             flows = flows[:-2] + [flows[-1]]  # remove a useless vflow
-            z = (
-                torch.randn(x.size(0), 2, x.size(2)).to(device=x.device, dtype=x.dtype)
-                * noise_scale
-            )
+            if noise is None:
+                noise = torch.randn(x.size(0), 2, x.size(2), generator=generator).to(device=x.device, dtype=x.dtype)
+            z = noise * noise_scale
             for flow in flows:
                 z = flow(z, x_mask, g=x, reverse=reverse)
             z0, z1 = torch.split(z, [1, 1], 1)
@@ -291,11 +291,13 @@ class DurationPredictor(nn.Module):
         if gin_channels != 0:
             self.cond = nn.Conv1d(gin_channels, in_channels, 1)
 
+    def project_speaker(self, g):
+        return self.cond(torch.detach(g))
+
     def forward(self, x, x_mask, g=None):
         x = torch.detach(x)
         if g is not None:
-            g = torch.detach(g)
-            x = x + self.cond(g)
+            x = x + commons.speaker_projection(self, g)
         x = self.conv_1(x * x_mask)
         x = torch.relu(x)
         x = self.norm_1(x)
@@ -357,15 +359,35 @@ class TextEncoder(nn.Module):
         )
         self.proj = nn.Conv1d(hidden_channels, out_channels * 2, 1)
 
-    def forward(self, x, x_lengths, tone, language, bert, ja_bert, g=None):
-        bert_emb = self.bert_proj(bert).transpose(1, 2)
-        ja_bert_emb = self.ja_bert_proj(ja_bert).transpose(1, 2)
+    def project_bert(self, bert, ja_bert, word2ph):
+        """Phone-level `bert_proj(bert) + ja_bert_proj(ja_bert)` [h, t] of one sentence from
+        its token-level features, [1024, n] and [768, n] or None when all zeros, and the
+        number of phones of each token [n].
+
+        The projections are per position, so they run on the n tokens before the expansion
+        to the t phones, and a missing input only contributes its bias.
+        """
+        dtype = self.bert_proj.weight.dtype
+        if bert is None:
+            bert_emb = self.bert_proj.bias[:, None]
+        else:
+            bert_emb = self.bert_proj(bert[None].to(dtype))[0]
+        if ja_bert is None:
+            ja_bert_emb = self.ja_bert_proj.bias[:, None]
+        else:
+            ja_bert_emb = self.ja_bert_proj(ja_bert[None].to(dtype))[0]
+        bert_emb = (bert_emb + ja_bert_emb).expand(-1, word2ph.size(0))
+        return bert_emb.repeat_interleave(word2ph, dim=1)
+
+    def forward(self, x, x_lengths, tone, language, bert, ja_bert, g=None, bert_emb=None):
+        # at inference the BERT embedding [b, h, t] can be given precomputed by `project_bert`
+        if bert_emb is None:
+            bert_emb = self.bert_proj(bert) + self.ja_bert_proj(ja_bert)
         x = (
             self.emb(x)
             + self.tone_emb(tone)
             + self.language_emb(language)
-            + bert_emb
-            + ja_bert_emb
+            + bert_emb.transpose(1, 2)
         ) * math.sqrt(
             self.hidden_channels
         )  # [b, t, h]
@@ -481,8 +503,10 @@ class Generator(torch.nn.Module):
         gin_channels=0,
     ):
         super(Generator, self).__init__()
+        self.gin_channels = gin_channels
         self.num_kernels = len(resblock_kernel_sizes)
         self.num_upsamples = len(upsample_rates)
+        self.upsample_rates = upsample_rates
         self.conv_pre = Conv1d(
             initial_channel, upsample_initial_channel, 7, 1, padding=3
         )
@@ -516,29 +540,73 @@ class Generator(torch.nn.Module):
         if gin_channels != 0:
             self.cond = nn.Conv1d(gin_channels, upsample_initial_channel, 1)
 
-    def forward(self, x, g=None):
+    def forward(self, x, g=None, x_mask=None):
+        # x_mask is only needed for padded batches: it keeps the padded frames at zero so
+        # every item is decoded exactly as it would be on its own.
         x = self.conv_pre(x)
         if g is not None:
-            x = x + self.cond(g)
+            x = x + commons.speaker_projection(self, g)
+        if x_mask is not None:
+            x = x * x_mask
 
         for i in range(self.num_upsamples):
             x = F.leaky_relu(x, modules.LRELU_SLOPE)
             x = self.ups[i](x)
+            if x_mask is not None:
+                x_mask = torch.repeat_interleave(x_mask, self.upsample_rates[i], dim=2)
             xs = None
             for j in range(self.num_kernels):
                 if xs is None:
-                    xs = self.resblocks[i * self.num_kernels + j](x)
+                    xs = self.resblocks[i * self.num_kernels + j](x, x_mask)
                 else:
-                    xs += self.resblocks[i * self.num_kernels + j](x)
+                    xs += self.resblocks[i * self.num_kernels + j](x, x_mask)
             x = xs / self.num_kernels
         x = F.leaky_relu(x)
         x = self.conv_post(x)
-        x = torch.tanh(x)
+        # the final activation runs in fp32 under reduced precision policies
+        x = torch.tanh(x.float())
 
         return x
 
-    def remove_weight_norm(self):
-        print("Removing weight norm...")
+    def project_speaker(self, g):
+        return self.cond(g)
+
+    def receptive_field(self):
+        """Number of input frames on each side that can influence one output frame."""
+        field = (self.conv_pre.kernel_size[0] - 1) // 2
+        scale = 1
+        for i in range(self.num_upsamples):
+            up = self.ups[i]
+            field += math.ceil(up.kernel_size[0] / up.stride[0]) / scale
+            scale *= up.stride[0]
+            resblock_fields = []
+            for j in range(self.num_kernels):
+                convs = [m for m in self.resblocks[i * self.num_kernels + j].modules() if isinstance(m, Conv1d)]
+                resblock_fields.append(sum((c.kernel_size[0] - 1) * c.dilation[0] // 2 for c in convs))
+            field += max(resblock_fields) / scale
+        field += ((self.conv_post.kernel_size[0] - 1) // 2) / scale
+        return math.ceil(field)
+
+    def iter_chunks(self, x, g=None, chunk_size=32, x_mask=None):
+        """Decode `x` in windows of `chunk_size` frames and yield the audio of each window.
+
+        Every window is extended by the receptive field on both sides and trimmed after
+        decoding, so the concatenated chunks match `forward` on the whole input up to float
+        error while the activations only ever cover one window.
+        """
+        context = self.receptive_field()
+        hop = math.prod(self.upsample_rates)
+        length = x.size(2)
+        for start in range(0, length, chunk_size):
+            end = min(start + chunk_size, length)
+            left, right = max(start - context, 0), min(end + context, length)
+            mask = None if x_mask is None else x_mask[:, :, left:right]
+            o = self(x[:, :, left:right], g=g, x_mask=mask)
+            yield o[:, :, (start - left) * hop : (end - left) * hop]
+
+    def remove_weight_norm(self, verbose=True):
+        if verbose:
+            print("Removing weight norm...")
         for layer in self.ups:
             remove_weight_norm(layer)
         for layer in self.resblocks:
@@ -883,6 +951,8 @@ class SynthesizerTrn(nn.Module):
         else:
             self.ref_enc = ReferenceEncoder(spec_channels, gin_channels, layernorm=norm_refenc)
         self.use_vc = use_vc
+        self.speaker_conditioning_cache = {}
+        self.optimized_for_inference = False
 
 
     def forward(self, x, x_lengths, y, y_lengths, sid, tone, language, bert, ja_bert):
@@ -925,6 +995,8 @@ class SynthesizerTrn(nn.Module):
                 neg_cent = neg_cent + epsilon
 
             attn_mask = torch.unsqueeze(x_mask, 2) * torch.unsqueeze(y_mask, -1)
+            # numba compiles the alignment search when imported, only training needs it
+            import melo.monotonic_align as monotonic_align
             attn = (
                 monotonic_align.maximum_path(neg_cent, attn_mask.squeeze(1))
                 .unsqueeze(1)
@@ -963,6 +1035,65 @@ class SynthesizerTrn(nn.Module):
             (x, logw, logw_),
         )
 
+    def cache_speaker_conditioning(self, speaker_ids):
+        """Precompute the embedding of every speaker in `speaker_ids` together with its
+        projection by each speaker-conditioned module (text encoder, duration predictors,
+        flows and decoder). `infer` reuses them instead of recomputing them per call.
+
+        The cache is tied to the current weights, device and dtype; call
+        `clear_speaker_conditioning` after changing any of them.
+        """
+        conditioned = [
+            m for m in self.modules()
+            if hasattr(m, "project_speaker") and getattr(m, "gin_channels", 0) != 0
+        ]
+        device = self.emb_g.weight.device
+        with torch.no_grad():
+            for sid in speaker_ids:
+                g = self.emb_g(torch.LongTensor([sid]).to(device)).unsqueeze(-1)
+                projections = {m: m.project_speaker(g.to(next(m.parameters()).dtype)) for m in conditioned}
+                self.speaker_conditioning_cache[sid] = commons.SpeakerConditioning(g, projections)
+
+    def clear_speaker_conditioning(self):
+        self.speaker_conditioning_cache = {}
+
+    def speaker_conditioning(self, sid):
+        cache = self.speaker_conditioning_cache
+        sids = sid.tolist()
+        if cache and all(s in cache for s in sids):
+            if len(sids) == 1:
+                return cache[sids[0]]
+            return commons.SpeakerConditioning.cat([cache[s] for s in sids])
+        return self.emb_g(sid).unsqueeze(-1)  # [b, h, 1]
+
+    def parameter_bytes(self):
+        tensors = list(self.parameters()) + list(self.buffers())
+        return sum(t.numel() * t.element_size() for t in tensors)
+
+    def optimize_for_inference(self, drop_posterior_encoder=False):
+        """Prepare the model for inference only, in place.
+
+        Weight norm is folded into the decoder and flow weights, so the kernels are no
+        longer recomputed on every forward. The model can no longer be trained afterwards.
+        With `drop_posterior_encoder` the posterior encoder, which only training and
+        `voice_conversion` use, is dropped as well. Calling it again is a no-op. Returns the
+        parameter memory in bytes before and after.
+        """
+        before = self.parameter_bytes()
+        if not self.optimized_for_inference:
+            self.dec.remove_weight_norm(verbose=False)
+            for module in self.flow.modules():
+                if isinstance(module, modules.WN):
+                    module.remove_weight_norm()
+            self.optimized_for_inference = True
+        if drop_posterior_encoder and self.enc_q is not None:
+            self.enc_q = None
+            # rebuild the cached speaker projections without the posterior encoder ones
+            speaker_ids = list(self.speaker_conditioning_cache)
+            self.clear_speaker_conditioning()
+            self.cache_speaker_conditioning(speaker_ids)
+        return before, self.parameter_bytes()
+
     def infer(
         self,
         x,
@@ -979,12 +1110,54 @@ class SynthesizerTrn(nn.Module):
         sdp_ratio=0,
         y=None,
         g=None,
+        dec_chunk_size=None,
+        generator=None,
+        bert_emb=None,
+        frame_bucket=1,
+    ):
+        z, attn, y_mask, g, latents = self.infer_latent(
+            x, x_lengths, sid, tone, language, bert, ja_bert,
+            noise_scale=noise_scale, length_scale=length_scale, noise_scale_w=noise_scale_w,
+            sdp_ratio=sdp_ratio, y=y, g=g, generator=generator, bert_emb=bert_emb,
+            frame_bucket=frame_bucket,
+        )
+        dec_mask = y_mask[:, :, :max_len] if x.size(0) > 1 or frame_bucket > 1 else None
+        if dec_chunk_size:
+            o = torch.cat(
+                list(self.dec.iter_chunks(z[:, :, :max_len], g=g, chunk_size=dec_chunk_size, x_mask=dec_mask)),
+                dim=2,
+            )
+        else:
+            o = self.dec(z[:, :, :max_len], g=g, x_mask=dec_mask)
+        # print('max/min of o:', o.max(), o.min())
+        return o, attn, y_mask, latents
+
+    def infer_latent(
+        self,
+        x,
+        x_lengths,
+        sid,
+        tone,
+        language,
+        bert,
+        ja_bert,
+        noise_scale=0.667,
+        length_scale=1,
+        noise_scale_w=0.8,
+        sdp_ratio=0,
+        y=None,
+        g=None,
+        generator=None,
+        bert_emb=None,
+        frame_bucket=1,
     ):
+        """Everything `infer` runs before the decoder. Returns the masked latent `z * y_mask`,
+        the alignment, `y_mask`, the speaker conditioning and (z, z_p, m_p, logs_p)."""
         # x, m_p, logs_p, x_mask = self.enc_p(x, x_lengths, tone, language, bert)
         # g = self.gst(y)
         if g is None:
             if self.n_speakers > 0:
-                g = self.emb_g(sid).unsqueeze(-1)  # [b, h, 1]
+                g = self.speaker_conditioning(sid)
             else:
                 g = self.ref_enc(y.transpose(1, 2)).unsqueeze(-1)
         if self.use_vc:
@@ -992,16 +1165,25 @@ class SynthesizerTrn(nn.Module):
         else:
             g_p = g
         x, m_p, logs_p, x_mask = self.enc_p(
-            x, x_lengths, tone, language, bert, ja_bert, g=g_p
+            x, x_lengths, tone, language, bert, ja_bert, g=g_p, bert_emb=bert_emb
         )
-        logw = self.sdp(x, x_mask, g=g, reverse=True, noise_scale=noise_scale_w) * (
-            sdp_ratio
-        ) + self.dp(x, x_mask, g=g) * (1 - sdp_ratio)
+        # only evaluate the duration predictors that are weighted in
+        if sdp_ratio == 0:
+            logw = self.dp(x, x_mask, g=g)
+        elif sdp_ratio == 1:
+            logw = self.sdp(x, x_mask, g=g, reverse=True, noise_scale=noise_scale_w, generator=generator)
+        else:
+            logw = self.sdp(x, x_mask, g=g, reverse=True, noise_scale=noise_scale_w, generator=generator) * (
+                sdp_ratio
+            ) + self.dp(x, x_mask, g=g) * (1 - sdp_ratio)
         w = torch.exp(logw) * x_mask * length_scale
         
         w_ceil = torch.ceil(w)
         y_lengths = torch.clamp_min(torch.sum(w_ceil, [1, 2]), 1).long()
-        y_mask = torch.unsqueeze(commons.sequence_mask(y_lengths, None), 1).to(
+        # padding the frame axis to a multiple of `frame_bucket` bounds the number of
+        # distinct lengths the flow and the decoder see, the padded frames are masked
+        y_max = -(-int(y_lengths.max()) // frame_bucket) * frame_bucket
+        y_mask = torch.unsqueeze(commons.sequence_mask(y_lengths, y_max), 1).to(
             x_mask.dtype
         )
         attn_mask = torch.unsqueeze(x_mask, 2) * torch.unsqueeze(y_mask, -1)
@@ -1014,13 +1196,16 @@ class SynthesizerTrn(nn.Module):
             1, 2
         )  # [b, t', t], [b, t, d] -> [b, d, t']
 
-        z_p = m_p + torch.randn_like(m_p) * torch.exp(logs_p) * noise_scale
+        z_p = m_p + commons.randn_like(m_p, generator=generator) * torch.exp(logs_p) * noise_scale
         z = self.flow(z_p, y_mask, g=g, reverse=True)
-        o = self.dec((z * y_mask)[:, :, :max_len], g=g)
-        # print('max/min of o:', o.max(), o.min())
-        return o, attn, y_mask, (z, z_p, m_p, logs_p)
+        return z * y_mask, attn, y_mask, g, (z, z_p, m_p, logs_p)
 
     def voice_conversion(self, y, y_lengths, sid_src, sid_tgt, tau=1.0):        
+        assert self.enc_q is not None, (
+            'voice_conversion needs the posterior encoder, which was dropped by '
+            'optimize_for_inference(drop_posterior_encoder=True) or is missing from an '
+            'inference-only checkpoint; load the full checkpoint instead'
+        )
         g_src = sid_src
         g_tgt = sid_tgt
         z, m_q, logs_q, y_mask = self.enc_q(y, y_lengths, g=g_src, tau=tau)
@@ -187,7 +187,7 @@ class WN(torch.nn.Module):
         n_channels_tensor = torch.IntTensor([self.hidden_channels])
 
         if g is not None:
-            g = self.cond_layer(g)
+            g = commons.speaker_projection(self, g)
 
         for i in range(self.n_layers):
             x_in = self.in_layers[i](x)
@@ -209,6 +209,9 @@ class WN(torch.nn.Module):
                 output = output + res_skip_acts
         return output * x_mask
 
+    def project_speaker(self, g):
+        return self.cond_layer(g)
+
     def remove_weight_norm(self):
         if self.gin_channels != 0:
             torch.nn.utils.remove_weight_norm(self.cond_layer)
@@ -0,0 +1,179 @@
+import os
+import hashlib
+
+import click
+import numpy as np
+import torch
+import torch.nn as nn
+
+ENCODER_FILE = 'encoder.onnx'
+DECODER_FILE = 'decoder.onnx'
+
+
+class OnnxEncoder(nn.Module):
+    """Text encoder and duration predictors of a `SynthesizerTrn`, up to the integer
+    phone durations. The stochastic duration predictor noise is an input so that the
+    caller controls the randomness."""
+
+    def __init__(self, model):
+        super().__init__()
+        self.model = model
+
+    def forward(self, x, x_lengths, sid, tone, language, bert, ja_bert, sdp_noise, noise_scale_w, length_scale, sdp_ratio):
+        model = self.model
+        g = model.emb_g(sid).unsqueeze(-1)
+        x, m_p, logs_p, x_mask = model.enc_p(
+            x, x_lengths, tone, language, bert, ja_bert, g=None if model.use_vc else g
+        )
+        logw = model.sdp(x, x_mask, g=g, reverse=True, noise_scale=noise_scale_w, noise=sdp_noise) * (
+            sdp_ratio
+        ) + model.dp(x, x_mask, g=g) * (1 - sdp_ratio)
+        w_ceil = torch.ceil(torch.exp(logw) * x_mask * length_scale)
+        return m_p, logs_p, w_ceil
+
+
+class OnnxDecoder(nn.Module):
+    """Reverse flow and waveform generator of a `SynthesizerTrn`, from the sampled prior."""
+
+    def __init__(self, model):
+        super().__init__()
+        self.model = model
+
+    def forward(self, z_p, y_mask, sid):
+        model = self.model
+        g = model.emb_g(sid).unsqueeze(-1)
+        z = model.flow(z_p, y_mask, g=g, reverse=True)
+        return model.dec(z * y_mask, g=g, x_mask=y_mask)
+
+
+def export_onnx(model, output_dir, opset_version=17):
+    """Export the inference path of `model` as two graphs split at the data-dependent
+    length regulation, which `OnnxSynthesizer` performs in numpy. `model` is moved to
+    fp32 on CPU in place."""
+    os.makedirs(output_dir, exist_ok=True)
+    model = model.float().cpu().eval()
+    b, t = 1, 16
+    x = torch.randint(1, 10, (b, t))
+    encoder_inputs = (
+        x,
+        torch.LongTensor([t]),
+        torch.LongTensor([0]),
+        torch.zeros_like(x),
+        torch.zeros_like(x),
+        torch.randn(b, model.enc_p.bert_proj.in_channels, t),
+        torch.randn(b, model.enc_p.ja_bert_proj.in_channels, t),
+        torch.randn(b, 2, t),
+        torch.tensor(0.8),
+        torch.tensor(1.0),
+        torch.tensor(0.2),
+    )
+    phone_axes = {0: 'batch', 1: 'phones'}
+    feature_axes = {0: 'batch', 2: 'phones'}
+    frame_axes = {0: 'batch', 2: 'frames'}
+    with torch.no_grad():
+        torch.onnx.export(
+            OnnxEncoder(model).eval(),
+            encoder_inputs,
+            os.path.join(output_dir, ENCODER_FILE),
+            input_names=['x', 'x_lengths', 'sid', 'tone', 'language', 'bert', 'ja_bert', 'sdp_noise', 'noise_scale_w', 'length_scale', 'sdp_ratio'],
+            output_names=['m_p', 'logs_p', 'w_ceil'],
+            dynamic_axes={
+                'x': phone_axes, 'x_lengths': {0: 'batch'}, 'sid': {0: 'batch'}, 'tone': phone_axes, 'language': phone_axes,
+                'bert': feature_axes, 'ja_bert': feature_axes, 'sdp_noise': feature_axes,
+                'm_p': feature_axes, 'logs_p': feature_axes, 'w_ceil': feature_axes,
+            },
+            opset_version=opset_version,
+            dynamo=False,
+        )
+        frames = 64
+        torch.onnx.export(
+            OnnxDecoder(model).eval(),
+            (torch.randn(b, model.inter_channels, frames), torch.ones(b, 1, frames), torch.LongTensor([0])),
+            os.path.join(output_dir, DECODER_FILE),
+            input_names=['z_p', 'y_mask', 'sid'],
+            output_names=['audio'],
+            dynamic_axes={'z_p': frame_axes, 'y_mask': frame_axes, 'sid': {0: 'batch'}, 'audio': {0: 'batch', 2: 'samples'}},
+            opset_version=opset_version,
+            dynamo=False,
+        )
+
+
+def regulate_length(m_p, logs_p, w_ceil):
+    """Numpy version of the length regulation in `SynthesizerTrn.infer`: every phone's
+    prior is repeated for its number of frames. Returns the expanded priors and y_mask."""
+    durations = w_ceil[:, 0].astype(np.int64)
+    y_lengths = np.maximum(durations.sum(1), 1)
+    batch_size, channels, max_len = m_p.shape[0], m_p.shape[1], y_lengths.max()
+    m_p_exp = np.zeros((batch_size, channels, max_len), dtype=m_p.dtype)
+    logs_p_exp = np.zeros((batch_size, channels, max_len), dtype=logs_p.dtype)
+    y_mask = np.zeros((batch_size, 1, max_len), dtype=np.float32)
+    for i in range(batch_size):
+        length = durations[i].sum()
+        m_p_exp[i, :, :length] = np.repeat(m_p[i], durations[i], axis=1)
+        logs_p_exp[i, :, :length] = np.repeat(logs_p[i], durations[i], axis=1)
+        y_mask[i, :, :y_lengths[i]] = 1
+    return m_p_exp, logs_p_exp, y_mask
+
+
+class OnnxSynthesizer(object):
+    """Runs the graphs written by `export_onnx` with onnxruntime. `infer` mirrors
+    `SynthesizerTrn.infer` on numpy arrays, with the noise drawn from a numpy `rng`."""
+
+    def __init__(self, onnx_dir, num_threads=None):
+        try:
+            import onnxruntime
+        except ImportError:
+            raise ImportError('the onnxruntime backend needs the onnx extra: pip install "melotts[onnx]"')
+
+        options = onnxruntime.SessionOptions()
+        options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if num_threads is not None:
+            options.intra_op_num_threads = num_threads
+        self.paths = [os.path.join(onnx_dir, ENCODER_FILE), os.path.join(onnx_dir, DECODER_FILE)]
+        self.encoder, self.decoder = [
+            onnxruntime.InferenceSession(path, options, providers=['CPUExecutionProvider']) for path in self.paths
+        ]
+
+    def checksum(self):
+        checksum = hashlib.sha1()
+        for path in self.paths:
+            with open(path, 'rb') as f:
+                checksum.update(f.read())
+        return checksum.hexdigest()
+
+    def infer(self, x, x_lengths, sid, tone, language, bert, ja_bert, noise_scale=0.667, length_scale=1, noise_scale_w=0.8, sdp_ratio=0, rng=None):
+        rng = np.random.default_rng() if rng is None else rng
+        m_p, logs_p, w_ceil = self.encoder.run(None, {
+            'x': x, 'x_lengths': x_lengths, 'sid': sid, 'tone': tone, 'language': language,
+            'bert': bert.astype(np.float32), 'ja_bert': ja_bert.astype(np.float32),
+            'sdp_noise': rng.standard_normal((x.shape[0], 2, x.shape[1]), dtype=np.float32),
+            'noise_scale_w': np.array(noise_scale_w, dtype=np.float32),
+            'length_scale': np.array(length_scale, dtype=np.float32),
+            'sdp_ratio': np.array(sdp_ratio, dtype=np.float32),
+        })
+        m_p, logs_p, y_mask = regulate_length(m_p, logs_p, w_ceil)
+        z_p = m_p + rng.standard_normal(m_p.shape, dtype=np.float32) * np.exp(logs_p) * noise_scale
+        audio, = self.decoder.run(None, {'z_p': z_p, 'y_mask': y_mask, 'sid': sid})
+        return audio, y_mask
+
+
+@click.command()
+@click.option('--language', '-l', default='EN', help='Language of the checkpoint, defaults to EN')
+@click.option('--output_dir', '-o', required=True, help='Directory the encoder and decoder graphs are written to')
+@click.option('--ckpt_path', '-c', default=None, help='Path to the checkpoint, downloaded if not given')
+@click.option('--config_path', default=None, help='Path to the config, downloaded if not given')
+@click.option('--opset', type=int, default=17)
+def main(language, output_dir, ckpt_path, config_path, opset):
+    try:
+        import onnx  # noqa: F401, torch.onnx.export writes the graphs with it
+    except ImportError:
+        raise click.ClickException('melo-export-onnx needs the onnx extra: pip install "melotts[onnx]"')
+    from melo.api import TTS
+
+    model = TTS(language=language, device='cpu', config_path=config_path, ckpt_path=ckpt_path)
+    export_onnx(model.model, output_dir, opset_version=opset)
+    print(f'Exported {ENCODER_FILE} and {DECODER_FILE} to {output_dir}')
+
+
+if __name__ == "__main__":
+    main()
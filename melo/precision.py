@@ -0,0 +1,51 @@
+import torch
+
+from . import commons
+
+DTYPES = {
+    'fp32': torch.float32,
+    'bf16': torch.bfloat16,
+    'fp16': torch.float16,
+}
+
+
+def default_policy(dtype):
+    """Reduced precision for the text encoder, flow and decoder. The duration predictors,
+    whose stochastic one runs the spline transforms, stay in fp32 and so does
+    `commons.generate_path`, which runs between the modules."""
+    return {'enc_p': dtype, 'flow': dtype, 'dec': dtype}
+
+
+def cast(x, dtype):
+    if torch.is_tensor(x):
+        return x.to(dtype) if x.is_floating_point() else x
+    if isinstance(x, commons.SpeakerConditioning):
+        # cached projections are computed in the dtype of the module that uses them
+        return commons.SpeakerConditioning(x.g.to(dtype), x.projections)
+    if isinstance(x, (tuple, list)):
+        return type(x)(cast(y, dtype) for y in x)
+    return x
+
+
+def apply_precision_policy(model, policy):
+    """Run the submodules of `model` named in `policy` in the given dtypes, either
+    torch dtypes or keys of `DTYPES`, e.g. {'dec': 'bf16', 'enc_p.encoder': 'bf16'}.
+
+    Every listed module is converted in place. Its floating point inputs are cast to the
+    module's dtype and its outputs back to fp32, so the code between modules keeps
+    running in fp32.
+    """
+    for name, dtype in policy.items():
+        dtype = DTYPES.get(dtype, dtype)
+        module = model.get_submodule(name)
+        module.to(dtype)
+
+        def pre_hook(module, args, kwargs, dtype=dtype):
+            return cast(args, dtype), {k: cast(v, dtype) for k, v in kwargs.items()}
+
+        def post_hook(module, args, output):
+            return cast(output, torch.float32)
+
+        module.register_forward_pre_hook(pre_hook, with_kwargs=True)
+        module.register_forward_hook(post_hook)
+    return model
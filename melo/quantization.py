@@ -0,0 +1,76 @@
+import copy
+import contextlib
+
+import torch
+from torch.ao.quantization import get_default_qconfig_mapping
+from torch.ao.quantization.quantize_fx import prepare_fx, convert_fx
+
+from . import commons
+
+
+def default_engine():
+    """fbgemm where it is available (x86), qnnpack otherwise (ARM)."""
+    return 'fbgemm' if 'fbgemm' in torch.backends.quantized.supported_engines else 'qnnpack'
+
+
+@contextlib.contextmanager
+def quantized_engine(engine):
+    """Select the quantized engine for the duration of the block only, the process-wide
+    setting is restored afterwards."""
+    previous = torch.backends.quantized.engine
+    torch.backends.quantized.engine = engine
+    try:
+        yield
+    finally:
+        torch.backends.quantized.engine = previous
+
+
+class GraphForward(object):
+    """Replacement of `Generator.forward` that runs an FX graph module traced with all of
+    x, g and x_mask as inputs, filling in what the eager signature leaves optional, under
+    the quantized engine it was prepared for."""
+
+    def __init__(self, graph_module, engine):
+        self.graph_module = graph_module
+        self.engine = engine
+
+    def __call__(self, x, g=None, x_mask=None):
+        # the speaker projection is part of the graph, only the embedding itself is needed
+        if isinstance(g, commons.SpeakerConditioning):
+            g = g.g
+        if x_mask is None:
+            x_mask = torch.ones_like(x[:, :1])
+        with quantized_engine(self.engine):
+            return self.graph_module(x, g, x_mask)
+
+
+def prepare_decoder(dec, backend=None):
+    """Start static int8 quantization of a `Generator`.
+
+    Weight norm is folded into the weights if still present, then an observed copy of the decoder is
+    installed as `dec.forward`, so that running inference records activation ranges.
+    Pass the returned module to `convert_decoder` once calibration is done. The x86
+    (oneDNN) engine builds kernels per input shape, taking seconds for every new sentence
+    length, hence fbgemm, or qnnpack where fbgemm is not available.
+    """
+    assert dec.gin_channels != 0, 'quantization expects a speaker conditioned decoder'
+    if hasattr(dec.ups[0], 'weight_g'):
+        dec.remove_weight_norm(verbose=False)
+    backend = backend or default_engine()
+    frames = 8
+    example_inputs = (
+        torch.randn(1, dec.conv_pre.in_channels, frames),
+        torch.randn(1, dec.gin_channels, 1),
+        torch.ones(1, 1, frames),
+    )
+    with quantized_engine(backend):
+        prepared = prepare_fx(copy.deepcopy(dec).eval(), get_default_qconfig_mapping(backend), example_inputs)
+    dec.forward = GraphForward(prepared, backend)
+    return prepared
+
+
+def convert_decoder(dec, prepared):
+    """Replace the observed decoder with its int8 version."""
+    engine = dec.forward.engine
+    with quantized_engine(engine):
+        dec.forward = GraphForward(convert_fx(prepared), engine)
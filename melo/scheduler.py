@@ -0,0 +1,137 @@
+import time
+import queue
+import threading
+from collections import Counter, namedtuple
+from concurrent.futures import Future
+
+WorkItem = namedtuple('WorkItem', ['features', 'speaker_id', 'params', 'future'])
+
+_STOP = object()
+
+
+class BatchScheduler(object):
+    """Dynamic micro-batching of sentence-level requests against one `TTS` instance.
+
+    Callers on any thread `submit` sentences and get back a `Future`. A worker thread
+    collects the queued sentences for up to `max_wait_ms` after the first one arrives, or
+    until `max_batch_size` sentences or `max_phones` padded phones are reached, runs them
+    as one padded `TTS.infer_batch` call and routes each waveform back to its future.
+    The text front-end runs on the calling thread, so only the acoustic model is shared.
+    """
+
+    def __init__(self, tts, max_batch_size=8, max_wait_ms=10, max_phones=4096):
+        self.tts = tts
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self.max_phones = max_phones
+        self.batch_size_histogram = Counter()
+        self._queue = queue.Queue()
+        self._carry = None
+        # guards `batch_size_histogram` and `_closed`, and orders submissions before `_STOP`
+        self._lock = threading.Lock()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def submit(self, text, speaker_id, sdp_ratio=0.2, noise_scale=0.6, noise_scale_w=0.8, speed=1.0):
+        """Queue one sentence; the returned future resolves to its float32 waveform."""
+        return self._submit_features(self.tts.get_text_features(text), speaker_id, sdp_ratio, noise_scale, noise_scale_w, speed)
+
+    def _submit_features(self, features, speaker_id, sdp_ratio, noise_scale, noise_scale_w, speed):
+        params = dict(sdp_ratio=sdp_ratio, noise_scale=noise_scale, noise_scale_w=noise_scale_w, speed=speed)
+        future = Future()
+        with self._lock:
+            if self._closed:
+                raise RuntimeError('cannot submit to a closed BatchScheduler')
+            self._queue.put(WorkItem(features, speaker_id, params, future))
+        return future
+
+    def synthesize(self, text, speaker_id, sdp_ratio=0.2, noise_scale=0.6, noise_scale_w=0.8, speed=1.0):
+        """Split `text` into sentences, synthesize them through the scheduler and return the
+        concatenated audio, like `TTS.tts_to_file` without an output path."""
+        texts = self.tts.split_sentences_into_pieces(text, self.tts.language, quiet=True)
+        # the sentences share one BERT forward
+        futures = [
+            self._submit_features(features, speaker_id, sdp_ratio, noise_scale, noise_scale_w, speed)
+            for features in self.tts.get_text_features_batch(texts)
+        ]
+        audio_list = [future.result() for future in futures]
+        return self.tts.audio_numpy_concat(audio_list, sr=self.tts.hps.data.sampling_rate, speed=speed)
+
+    def stats(self):
+        with self._lock:
+            histogram = Counter(self.batch_size_histogram)
+        n_batches = sum(histogram.values())
+        n_items = sum(size * count for size, count in histogram.items())
+        return {
+            'batches': n_batches,
+            'sentences': n_items,
+            'mean_batch_size': n_items / n_batches if n_batches else 0.,
+            'batch_size_histogram': dict(sorted(histogram.items())),
+        }
+
+    def close(self):
+        """Synthesize the sentences already queued, then stop the worker. Later `submit`
+        calls raise, and any item left behind fails instead of never resolving."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._queue.put(_STOP)
+        self._thread.join()
+        leftover = [self._carry]
+        self._carry = None
+        while not self._queue.empty():
+            leftover.append(self._queue.get_nowait())
+        for item in leftover:
+            if isinstance(item, WorkItem) and item.future.set_running_or_notify_cancel():
+                item.future.set_exception(RuntimeError('BatchScheduler closed before the sentence was synthesized'))
+
+    @staticmethod
+    def _n_phones(batch):
+        return len(batch) * max(item.features[2].size(0) for item in batch)
+
+    def _collect(self):
+        """Block for the first item, then gather compatible items until a limit is hit."""
+        item = self._carry if self._carry is not None else self._queue.get()
+        self._carry = None
+        if item is _STOP:
+            return None
+        batch = [item]
+        deadline = time.monotonic() + self.max_wait_ms / 1000.
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                break
+            if item is _STOP or item.params != batch[0].params or self._n_phones(batch + [item]) > self.max_phones:
+                self._carry = item
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            if batch is None:
+                break
+            batch = [item for item in batch if item.future.set_running_or_notify_cancel()]
+            if not batch:
+                continue
+            try:
+                audio_list = self.tts.infer_batch(
+                    [item.features for item in batch],
+                    [item.speaker_id for item in batch],
+                    **batch[0].params,
+                )
+            except Exception as e:
+                for item in batch:
+                    item.future.set_exception(e)
+            else:
+                for item, audio in zip(batch, audio_list):
+                    item.future.set_result(audio)
+            with self._lock:
+                self.batch_size_histogram[len(batch)] += 1
@@ -0,0 +1,144 @@
+import os
+import struct
+import asyncio
+from typing import Optional
+from concurrent.futures import ThreadPoolExecutor
+
+import click
+
+LANGUAGES = ['EN', 'ES', 'FR', 'ZH', 'JP', 'KR']
+
+
+def wav_header(sampling_rate, channels=1, bits_per_sample=16):
+    """RIFF header of a 16-bit PCM stream of unknown length, for chunked responses."""
+    byte_rate = sampling_rate * channels * bits_per_sample // 8
+    block_align = channels * bits_per_sample // 8
+    unknown_size = 0xFFFFFFFF
+    return (
+        b'RIFF' + struct.pack('<I', unknown_size) + b'WAVE'
+        + b'fmt ' + struct.pack('<IHHIIHH', 16, 1, channels, sampling_rate, byte_rate, block_align, bits_per_sample)
+        + b'data' + struct.pack('<I', unknown_size)
+    )
+
+
+def create_app(languages=LANGUAGES, device='auto', threads=1):
+    # the server dependencies are an extra: pip install melotts[server]
+    from fastapi import FastAPI, HTTPException, WebSocket, WebSocketDisconnect
+    from fastapi.responses import StreamingResponse
+    from pydantic import BaseModel, ValidationError
+    from melo.api import TTS
+
+    class TTSRequest(BaseModel):
+        text: str
+        language: str = 'EN'
+        speaker: Optional[str] = None
+        speed: float = 1.0
+        sdp_ratio: float = 0.2
+        noise_scale: float = 0.6
+        noise_scale_w: float = 0.8
+        format: str = 'wav'
+
+    models = {language: TTS(language=language, device=device) for language in languages}
+    executor = ThreadPoolExecutor(max_workers=threads)
+    app = FastAPI(title='MeloTTS')
+
+    def resolve(request):
+        language = request.language.upper()
+        if language not in models:
+            raise HTTPException(status_code=400, detail=f'Language {request.language} is not served, available: {list(models)}')
+        if request.format not in ['wav', 'pcm']:
+            raise HTTPException(status_code=400, detail=f'Unknown format {request.format}, use wav or pcm')
+        model = models[language]
+        spk2id = model.hps.data.spk2id
+        speaker = request.speaker or list(spk2id.keys())[0]
+        if speaker not in spk2id:
+            raise HTTPException(status_code=400, detail=f'Unknown speaker {speaker}, available: {list(spk2id.keys())}')
+        return model, spk2id[speaker]
+
+    async def iterate(model, speaker_id, request):
+        # tts_iter is a blocking generator: every sentence is produced on the executor so the
+        # event loop keeps serving other connections.
+        loop = asyncio.get_running_loop()
+        chunks = model.tts_iter(request.text, speaker_id, sdp_ratio=request.sdp_ratio, noise_scale=request.noise_scale,
+                                noise_scale_w=request.noise_scale_w, speed=request.speed, quiet=True, dtype='int16')
+        while True:
+            chunk = await loop.run_in_executor(executor, next, chunks, None)
+            if chunk is None:
+                break
+            yield chunk
+
+    @app.get('/speakers')
+    async def speakers():
+        return {language: list(model.hps.data.spk2id.keys()) for language, model in models.items()}
+
+    @app.post('/tts')
+    async def tts(request: TTSRequest):
+        model, speaker_id = resolve(request)
+        sampling_rate = model.hps.data.sampling_rate
+
+        async def body():
+            if request.format == 'wav':
+                yield wav_header(sampling_rate)
+            async for chunk in iterate(model, speaker_id, request):
+                # WAV samples are little-endian, audio/L16 is big-endian (RFC 2586)
+                yield chunk.tobytes() if request.format == 'wav' else chunk.astype('>i2').tobytes()
+
+        media_type = 'audio/wav' if request.format == 'wav' else f'audio/L16;rate={sampling_rate};channels=1'
+        return StreamingResponse(body(), media_type=media_type)
+
+    @app.websocket('/ws')
+    async def websocket_tts(websocket: WebSocket):
+        # Every JSON request on the socket is answered with a start event, one binary
+        # message per sentence of little-endian int16 mono PCM, and an end event.
+        await websocket.accept()
+        try:
+            while True:
+                message = await websocket.receive_json()
+                try:
+                    request = TTSRequest(**message)
+                    model, speaker_id = resolve(request)
+                except ValidationError as e:
+                    await websocket.send_json({'event': 'error', 'detail': str(e)})
+                    continue
+                except HTTPException as e:
+                    await websocket.send_json({'event': 'error', 'detail': e.detail})
+                    continue
+                await websocket.send_json({'event': 'start', 'sampling_rate': model.hps.data.sampling_rate})
+                async for chunk in iterate(model, speaker_id, request):
+                    await websocket.send_bytes(chunk.astype('<i2').tobytes())
+                await websocket.send_json({'event': 'end'})
+        except WebSocketDisconnect:
+            pass
+
+    return app
+
+
+def app_from_env():
+    return create_app(
+        languages=os.environ.get('MELO_SERVER_LANGUAGES', ','.join(LANGUAGES)).split(','),
+        device=os.environ.get('MELO_SERVER_DEVICE', 'auto'),
+        threads=int(os.environ.get('MELO_SERVER_THREADS', '1')),
+    )
+
+
+@click.command()
+@click.option('--host', '-h', default='127.0.0.1')
+@click.option('--port', '-p', type=int, default=8000)
+@click.option('--language', '-l', multiple=True, default=LANGUAGES, type=click.Choice(LANGUAGES, case_sensitive=False), help='Languages to load, may be repeated. Defaults to all.')
+@click.option('--device', '-d', default='auto', help='Device, defaults to auto')
+@click.option('--workers', '-w', type=int, default=1, help='Number of server processes, each loads its own models')
+@click.option('--threads', '-t', type=int, default=1, help='Synthesis threads per process')
+def main(host, port, language, device, workers, threads):
+    try:
+        import uvicorn
+    except ImportError:
+        raise click.ClickException('melo-server needs the server extra: pip install "melotts[server]"')
+
+    os.environ['MELO_SERVER_LANGUAGES'] = ','.join(l.upper() for l in language)
+    os.environ['MELO_SERVER_DEVICE'] = device
+    os.environ['MELO_SERVER_THREADS'] = str(threads)
+    uvicorn.run('melo.server:app_from_env', factory=True, host=host, port=port, workers=workers)
+
+
+if __name__ == "__main__":
+    main()
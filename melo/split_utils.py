@@ -3,7 +3,6 @@ import os
 import glob
 import numpy as np
 import soundfile as sf
-import torchaudio
 import re
 
 def split_sentence(text, min_len=10, language_str='EN'):
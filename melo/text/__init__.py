@@ -1,3 +1,6 @@
+import importlib
+from collections.abc import Mapping
+
 from .symbols import *
 
 
@@ -20,16 +23,62 @@ def cleaned_text_to_sequence(cleaned_text, tones, language, symbol_to_id=None):
     return phones, tones, lang_ids
 
 
+language_bert_model_id_map = {
+    'ZH': 'hfl/chinese-roberta-wwm-ext-large',
+    'ZH_MIX_EN': 'bert-base-multilingual-uncased',
+    'EN': 'bert-base-uncased',
+    'JP': 'tohoku-nlp/bert-base-japanese-v3',
+    'KR': 'kykim/bert-kor-base',
+    'FR': 'dbmdz/bert-base-french-europeana-cased',
+    'SP': 'dccuchile/bert-base-spanish-wwm-uncased',
+    'ES': 'dccuchile/bert-base-spanish-wwm-uncased',
+}
+
+
+class LazyModuleMap(Mapping):
+    """Maps language codes to modules of this package, imported on first lookup so that a
+    process only pays for the front ends of the languages it serves."""
+
+    def __init__(self, module_names):
+        self.module_names = module_names
+
+    def __getitem__(self, language):
+        return importlib.import_module('.' + self.module_names[language], __name__)
+
+    def __iter__(self):
+        return iter(self.module_names)
+
+    def __len__(self):
+        return len(self.module_names)
+
+
+language_bert_module_map = LazyModuleMap({
+    'ZH': 'chinese_bert',
+    'ZH_MIX_EN': 'chinese_mix',
+    'EN': 'english_bert',
+    'JP': 'japanese_bert',
+    'KR': 'korean',
+    'FR': 'french_bert',
+    'SP': 'spanish_bert',
+    'ES': 'spanish_bert',
+})
+
+
 def get_bert(norm_text, word2ph, language, device):
-    from .chinese_bert import get_bert_feature as zh_bert
-    from .english_bert import get_bert_feature as en_bert
-    from .japanese_bert import get_bert_feature as jp_bert
-    from .chinese_mix import get_bert_feature as zh_mix_en_bert
-    from .spanish_bert import get_bert_feature as sp_bert
-    from .french_bert import get_bert_feature as fr_bert
-    from .korean import get_bert_feature as kr_bert
-
-    lang_bert_func_map = {"ZH": zh_bert, "EN": en_bert, "JP": jp_bert, 'ZH_MIX_EN': zh_mix_en_bert, 
-                          'FR': fr_bert, 'SP': sp_bert, 'ES': sp_bert, "KR": kr_bert}
-    bert = lang_bert_func_map[language](norm_text, word2ph, device)
+    bert = language_bert_module_map[language].get_bert_feature(norm_text, word2ph, device)
     return bert
+
+
+def get_bert_batch(norm_texts, word2phs, language, device):
+    """`get_bert` of several sentences, tokenized with padding and run through BERT in a
+    single forward."""
+    return language_bert_module_map[language].get_bert_feature_batch(norm_texts, word2phs, device)
+
+
+def get_bert_token_batch(norm_texts, language, device, backend='torch', token_ids=None):
+    """Token-level BERT features [hidden, n_tokens] of several sentences, before the
+    expansion to phones by word2ph, computed by the given `bert_backends` backend. The
+    `token_ids` of `cleaner.front_end` skip the tokenization when given."""
+    return language_bert_module_map[language].get_bert_token_feature_batch(
+        norm_texts, device, backend=backend, token_ids=token_ids
+    )
@@ -0,0 +1,98 @@
+import os
+from collections import namedtuple
+
+import numpy as np
+import torch
+import torch.nn as nn
+
+# How the BERT encoders of the text front-end run, selected per language with
+# `bert_backend` in the data section of the config. 'int8' and 'onnxruntime' run on CPU.
+BACKENDS = ['torch', 'int8', 'onnxruntime']
+
+OnnxBertOutput = namedtuple('OnnxBertOutput', ['last_hidden_state'])
+
+# exported graphs are written once per model and reused by later processes
+ONNX_DIR = os.environ.get('MELO_BERT_ONNX_DIR', os.path.join(os.path.expanduser('~'), '.cache', 'melo', 'bert_onnx'))
+ONNX_OPSET = 17
+# bump when the exported wrapper changes, so that graphs cached by older versions are not reused
+ONNX_FORMAT_VERSION = 1
+
+
+def quantize_int8(model):
+    """Dynamic int8 quantization of the linear layers, the weights are quantized once and
+    the activations on the fly."""
+    return torch.ao.quantization.quantize_dynamic(model.cpu().float(), {nn.Linear}, dtype=torch.qint8)
+
+
+class LastHiddenState(nn.Module):
+
+    def __init__(self, model):
+        super().__init__()
+        self.model = model
+
+    def forward(self, input_ids, attention_mask, token_type_ids):
+        return self.model(
+            input_ids=input_ids, attention_mask=attention_mask, token_type_ids=token_type_ids
+        ).last_hidden_state
+
+
+def export_bert_onnx(model, output_path, opset_version=ONNX_OPSET):
+    """Export the last hidden state of `model` with dynamic batch and sequence axes."""
+    os.makedirs(os.path.dirname(output_path) or '.', exist_ok=True)
+    wrapper = LastHiddenState(model.cpu().float()).eval()
+    input_ids = torch.ones(2, 8, dtype=torch.long)
+    axes = {0: 'batch', 1: 'tokens'}
+    # write to a temporary file first, so that concurrent processes never load a partial graph
+    tmp_path = f'{output_path}.{os.getpid()}.tmp'
+    with torch.no_grad():
+        torch.onnx.export(
+            wrapper,
+            (input_ids, torch.ones_like(input_ids), torch.zeros_like(input_ids)),
+            tmp_path,
+            input_names=['input_ids', 'attention_mask', 'token_type_ids'],
+            output_names=['last_hidden_state'],
+            dynamic_axes={'input_ids': axes, 'attention_mask': axes, 'token_type_ids': axes, 'last_hidden_state': axes},
+            opset_version=opset_version,
+            dynamo=False,
+        )
+    os.replace(tmp_path, output_path)
+
+
+def onnx_path(model_id, num_hidden_layers):
+    """Cache path of the graph of `model_id` truncated to `num_hidden_layers`, the opset
+    and the format version are part of the name so a stale graph is never loaded."""
+    name = f"{model_id.replace('/', '--')}.layers{num_hidden_layers}.opset{ONNX_OPSET}.v{ONNX_FORMAT_VERSION}.onnx"
+    return os.path.join(ONNX_DIR, name)
+
+
+class OnnxBert(object):
+    """Runs a graph written by `export_bert_onnx` with onnxruntime behind the call
+    signature of the transformers model, so the extractors use either one."""
+
+    def __init__(self, path, num_threads=None):
+        try:
+            import onnxruntime
+        except ImportError:
+            raise ImportError('the onnxruntime BERT backend needs the onnx extra: pip install "melotts[onnx]"')
+
+        options = onnxruntime.SessionOptions()
+        options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if num_threads is not None:
+            options.intra_op_num_threads = num_threads
+        self.session = onnxruntime.InferenceSession(path, options, providers=['CPUExecutionProvider'])
+
+    def __call__(self, input_ids, attention_mask=None, token_type_ids=None):
+        if attention_mask is None:
+            attention_mask = torch.ones_like(input_ids)
+        if token_type_ids is None:
+            token_type_ids = torch.zeros_like(input_ids)
+        last_hidden_state, = self.session.run(None, {
+            'input_ids': input_ids.cpu().numpy().astype(np.int64),
+            'attention_mask': attention_mask.cpu().numpy().astype(np.int64),
+            'token_type_ids': token_type_ids.cpu().numpy().astype(np.int64),
+        })
+        return OnnxBertOutput(torch.from_numpy(last_hidden_state))
+
+    def eval(self):
+        return self
+
@@ -0,0 +1,36 @@
+import torch
+
+from . import bert_registry
+
+# BERT features of the text front-end, shared by the language modules which only differ
+# by their model_id.
+
+
+def get_token_features(model_id, texts, device=None, backend='torch', token_ids=None):
+    """Token-level features [hidden, n_tokens] of several sentences with a single padded forward.
+    `token_ids`, with the special tokens, are used instead of tokenizing `texts` when given."""
+    device = bert_registry.resolve_device(device, backend)
+    model = bert_registry.get_model(model_id, device, backend=backend)
+    tokenizer = bert_registry.get_tokenizer(model_id)
+    with torch.no_grad():
+        if token_ids is None:
+            inputs = tokenizer(texts, padding=True, return_tensors="pt")
+        else:
+            inputs = tokenizer.pad({"input_ids": token_ids}, return_tensors="pt")
+        for i in inputs:
+            inputs[i] = inputs[i].to(device)
+        res = model(**inputs).last_hidden_state.cpu()
+        lengths = inputs["attention_mask"].sum(-1).tolist()
+    return [feature[:length].T.contiguous() for feature, length in zip(res, lengths)]
+
+
+def get_phone_features(model_id, texts, word2phs, device=None, check_length=True):
+    """Phone-level features of several sentences with a single padded forward. Without
+    `check_length` the tokens past the end of `word2ph` are dropped."""
+    phone_level_features = []
+    for feature, word2ph in zip(get_token_features(model_id, texts, device), word2phs):
+        if check_length:
+            assert feature.size(1) == len(word2ph), f"{feature.size(1)}/{len(word2ph)}"
+        phone_level_feature = feature[:, :len(word2ph)].repeat_interleave(torch.tensor(word2ph), dim=1)
+        phone_level_features.append(phone_level_feature)
+    return phone_level_features
@@ -0,0 +1,109 @@
+import os
+import sys
+import threading
+
+import torch
+
+from . import bert_backends
+
+# Process-wide BERT models keyed by (model_id, device, dtype, backend), shared by every language
+# module and TTS instance, so memory scales with the distinct models in use. Tokenizers
+# are shared per model_id.
+#
+# The features are the hidden states of the third to last layer, so the encoder is loaded
+# without its last `DROPPED_LAYERS` layers, the pooler and the masked LM head, and its
+# `last_hidden_state` is the feature.
+DROPPED_LAYERS = 2
+_lock = threading.RLock()
+_models = {}  # key -> [model, or None until first used, refcount]
+_tokenizers = {}
+
+
+def resolve_device(device, backend='torch'):
+    if backend != 'torch':
+        # int8 and onnxruntime encoders run on CPU
+        return 'cpu'
+    if (
+        sys.platform == "darwin"
+        and torch.backends.mps.is_available()
+        and device == "cpu"
+    ):
+        device = "mps"
+    if not device:
+        device = "cuda"
+    return str(device)
+
+
+def get_tokenizer(model_id):
+    with _lock:
+        if model_id not in _tokenizers:
+            from transformers import AutoTokenizer
+            _tokenizers[model_id] = AutoTokenizer.from_pretrained(model_id)
+        return _tokenizers[model_id]
+
+
+def _load(model_id, device, dtype, backend):
+    from transformers import AutoConfig, AutoModel
+    num_hidden_layers = AutoConfig.from_pretrained(model_id).num_hidden_layers - DROPPED_LAYERS
+    onnx_path = bert_backends.onnx_path(model_id, num_hidden_layers)
+    if backend == 'onnxruntime' and os.path.exists(onnx_path):
+        return bert_backends.OnnxBert(onnx_path)
+    model = AutoModel.from_pretrained(
+        model_id, torch_dtype=dtype, num_hidden_layers=num_hidden_layers, add_pooling_layer=False
+    ).to(device).eval()
+    if backend == 'int8':
+        return bert_backends.quantize_int8(model)
+    if backend == 'onnxruntime':
+        bert_backends.export_bert_onnx(model, onnx_path)
+        return bert_backends.OnnxBert(onnx_path)
+    return model
+
+
+def _key(model_id, device, dtype, backend):
+    assert backend in bert_backends.BACKENDS, f'Unknown BERT backend {backend}, use one of {bert_backends.BACKENDS}'
+    return (model_id, resolve_device(device, backend), dtype, backend)
+
+
+def get_model(model_id, device=None, dtype=torch.float32, backend='torch'):
+    """Return the model, loading it on first use without taking a reference."""
+    with _lock:
+        key = _key(model_id, device, dtype, backend)
+        entry = _models.setdefault(key, [None, 0])
+        if entry[0] is None:
+            entry[0] = _load(model_id, key[1], dtype, backend)
+        return entry[0]
+
+
+def acquire(model_id, device=None, dtype=torch.float32, backend='torch'):
+    """Take a reference on the model without loading it, the first `get_model` loads it."""
+    with _lock:
+        _models.setdefault(_key(model_id, device, dtype, backend), [None, 0])[1] += 1
+
+
+def release(model_id, device=None, dtype=torch.float32, backend='torch'):
+    """Drop a reference taken by `acquire`, the model is unloaded with the last one."""
+    key = (model_id, resolve_device(device, backend), dtype, backend)
+    with _lock:
+        entry = _models.get(key)
+        if entry is None:
+            return
+        entry[1] -= 1
+        if entry[1] <= 0:
+            del _models[key]
+
+
+def unload(model_id=None):
+    """Unload every model, or every copy of `model_id`, regardless of references."""
+    with _lock:
+        for key in [key for key in _models if model_id is None or key[0] == model_id]:
+            del _models[key]
+        if model_id is None:
+            _tokenizers.clear()
+        else:
+            _tokenizers.pop(model_id, None)
+
+
+def loaded():
+    """{(model_id, device, dtype, backend): refcount} of the loaded models."""
+    with _lock:
+        return {key: entry[1] for key, entry in _models.items() if entry[0] is not None}
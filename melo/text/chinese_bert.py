@@ -1,49 +1,20 @@
-import torch
-import sys
-from transformers import AutoTokenizer, AutoModelForMaskedLM
+from . import bert_features
 
 
 # model_id = 'hfl/chinese-roberta-wwm-ext-large'
 local_path = "./bert/chinese-roberta-wwm-ext-large"
 
 
-tokenizers = {}
-models = {}
-
 def get_bert_feature(text, word2ph, device=None, model_id='hfl/chinese-roberta-wwm-ext-large'):
-    if model_id not in models:
-        models[model_id] = AutoModelForMaskedLM.from_pretrained(
-            model_id
-        ).to(device)
-        tokenizers[model_id] = AutoTokenizer.from_pretrained(model_id)
-    model = models[model_id]
-    tokenizer = tokenizers[model_id]
+    return get_bert_feature_batch([text], [word2ph], device, model_id)[0]
 
-    if (
-        sys.platform == "darwin"
-        and torch.backends.mps.is_available()
-        and device == "cpu"
-    ):
-        device = "mps"
-    if not device:
-        device = "cuda"
 
-    with torch.no_grad():
-        inputs = tokenizer(text, return_tensors="pt")
-        for i in inputs:
-            inputs[i] = inputs[i].to(device)
-        res = model(**inputs, output_hidden_states=True)
-        res = torch.cat(res["hidden_states"][-3:-2], -1)[0].cpu()
-    # import pdb; pdb.set_trace()
-    # assert len(word2ph) == len(text) + 2
-    word2phone = word2ph
-    phone_level_feature = []
-    for i in range(len(word2phone)):
-        repeat_feature = res[i].repeat(word2phone[i], 1)
-        phone_level_feature.append(repeat_feature)
+def get_bert_feature_batch(texts, word2phs, device=None, model_id='hfl/chinese-roberta-wwm-ext-large'):
+    return bert_features.get_phone_features(model_id, texts, word2phs, device, check_length=False)
 
-    phone_level_feature = torch.cat(phone_level_feature, dim=0)
-    return phone_level_feature.T
+
+def get_bert_token_feature_batch(texts, device=None, model_id='hfl/chinese-roberta-wwm-ext-large', backend='torch', token_ids=None):
+    return bert_features.get_token_features(model_id, texts, device, backend, token_ids)
 
 
 if __name__ == "__main__":
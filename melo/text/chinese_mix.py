@@ -8,7 +8,7 @@ from pypinyin import lazy_pinyin, Style
 from .symbols import language_tone_start_map
 from .tone_sandhi import ToneSandhi
 from .english import g2p as g2p_en
-from transformers import AutoTokenizer
+from . import bert_registry
 
 punctuation = ["!", "?", "…", ",", ".", "'", "-"]
 current_file_path = os.path.dirname(__file__)
@@ -97,7 +97,6 @@ def _get_initials_finals(word):
     return initials, finals
 
 model_id = 'bert-base-multilingual-uncased'
-tokenizer = AutoTokenizer.from_pretrained(model_id)
 def _g2p(segments):
     phones_list = []
     tones_list = []
@@ -125,7 +124,7 @@ def _g2p(segments):
         #
         for c, v in zip(initials, finals):
             if c == 'EN_WORD':
-                tokenized_en = tokenizer.tokenize(v)
+                tokenized_en = bert_registry.get_tokenizer(model_id).tokenize(v)
                 phones_en, tones_en, word2ph_en = g2p_en(text=None, pad_start_end=False, tokenized=tokenized_en)
                 # apply offset to tones_en
                 tones_en = [t + language_tone_start_map['EN'] for t in tones_en]
@@ -198,6 +197,16 @@ def get_bert_feature(text, word2ph, device):
     from . import chinese_bert
     return chinese_bert.get_bert_feature(text, word2ph, model_id='bert-base-multilingual-uncased', device=device)
 
+
+def get_bert_feature_batch(texts, word2phs, device):
+    from . import chinese_bert
+    return chinese_bert.get_bert_feature_batch(texts, word2phs, model_id='bert-base-multilingual-uncased', device=device)
+
+
+def get_bert_token_feature_batch(texts, device, backend='torch', token_ids=None):
+    from . import chinese_bert
+    return chinese_bert.get_bert_token_feature_batch(texts, model_id='bert-base-multilingual-uncased', device=device, backend=backend, token_ids=token_ids)
+
 from .chinese import _g2p as _chinese_g2p
 def _g2p_v2(segments):
     spliter = '#$&^!@'
@@ -217,7 +226,7 @@ def _g2p_v2(segments):
         for text in texts:
             if re.match('[a-zA-Z\s]+', text):
                 # english
-                tokenized_en = tokenizer.tokenize(text)
+                tokenized_en = bert_registry.get_tokenizer(model_id).tokenize(text)
                 phones_en, tones_en, word2ph_en = g2p_en(text=None, pad_start_end=False, tokenized=tokenized_en)
                 # apply offset to tones_en
                 tones_en = [t + language_tone_start_map['EN'] for t in tones_en]
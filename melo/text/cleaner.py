@@ -1,9 +1,42 @@
-from . import chinese, japanese, english, chinese_mix, korean, french, spanish
-from . import cleaned_text_to_sequence
+from collections import namedtuple
+from . import cleaned_text_to_sequence, LazyModuleMap, language_bert_model_id_map
+from . import bert_registry
 import copy
 
-language_module_map = {"ZH": chinese, "JP": japanese, "EN": english, 'ZH_MIX_EN': chinese_mix, 'KR': korean,
-                    'FR': french, 'SP': spanish, 'ES': spanish}
+# the front ends are imported on first use, they load taggers, dictionaries and tokenizers
+language_module_map = LazyModuleMap({"ZH": "chinese", "JP": "japanese", "EN": "english", 'ZH_MIX_EN': "chinese_mix",
+                    'KR': "korean", 'FR': "french", 'SP': "spanish", 'ES': "spanish"})
+
+
+def normalize_text(text, language):
+    return language_module_map[language].text_normalize(text)
+
+
+# the g2p of these languages groups the phones by the BERT word pieces
+TOKENIZED_G2P_LANGUAGES = {"EN", "FR", "SP", "ES", "JP", "KR"}
+
+FrontEndResult = namedtuple("FrontEndResult", ["norm_text", "phones", "tones", "word2ph", "token_ids"])
+
+
+def front_end(text, language):
+    """`clean_text` that also returns the BERT token ids, special tokens included, of the
+    languages in `TOKENIZED_G2P_LANGUAGES`, None for the others.
+
+    The text is tokenized once, for the g2p and for the BERT forward, so `word2ph` has
+    exactly one entry per token id.
+    """
+    language_module = language_module_map[language]
+    norm_text = language_module.text_normalize(text)
+    if language not in TOKENIZED_G2P_LANGUAGES:
+        phones, tones, word2ph = language_module.g2p(norm_text)
+        return FrontEndResult(norm_text, phones, tones, word2ph, None)
+    tokenizer = bert_registry.get_tokenizer(language_bert_model_id_map[language])
+    tokenized = tokenizer.tokenize(norm_text)
+    phones, tones, word2ph = language_module.g2p(norm_text, tokenized=tokenized)
+    # the g2p pads word2ph for [CLS] and [SEP] like the BERT tokenizers add them
+    token_ids = [tokenizer.cls_token_id] + tokenizer.convert_tokens_to_ids(tokenized) + [tokenizer.sep_token_id]
+    assert len(word2ph) == len(token_ids), (norm_text, tokenized)
+    return FrontEndResult(norm_text, phones, tones, word2ph, token_ids)
 
 
 def clean_text(text, language):
@@ -8,9 +8,8 @@ from . import symbols
 from .english_utils.abbreviations import expand_abbreviations
 from .english_utils.time_norm import expand_time_english
 from .english_utils.number_norm import normalize_numbers
-from .japanese import distribute_phone
 
-from transformers import AutoTokenizer
+from . import bert_registry
 
 current_file_path = os.path.dirname(__file__)
 CMU_DICT_PATH = os.path.join(current_file_path, "cmudict.rep")
@@ -178,6 +177,15 @@ def refine_syllables(syllables):
     return phonemes, tones
 
 
+def distribute_phone(n_phone, n_word):
+    phones_per_word = [0] * n_word
+    for task in range(n_phone):
+        min_tasks = min(phones_per_word)
+        min_index = phones_per_word.index(min_tasks)
+        phones_per_word[min_index] += 1
+    return phones_per_word
+
+
 def text_normalize(text):
     text = text.lower()
     text = expand_time_english(text)
@@ -186,9 +194,8 @@ def text_normalize(text):
     return text
 
 model_id = 'bert-base-uncased'
-tokenizer = AutoTokenizer.from_pretrained(model_id)
 def g2p_old(text):
-    tokenized = tokenizer.tokenize(text)
+    tokenized = bert_registry.get_tokenizer(model_id).tokenize(text)
     # import pdb; pdb.set_trace()
     phones = []
     tones = []
@@ -216,7 +223,7 @@ def g2p_old(text):
 
 def g2p(text, pad_start_end=True, tokenized=None):
     if tokenized is None:
-        tokenized = tokenizer.tokenize(text)
+        tokenized = bert_registry.get_tokenizer(model_id).tokenize(text)
     # import pdb; pdb.set_trace()
     phs = []
     ph_groups = []
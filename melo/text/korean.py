@@ -3,7 +3,7 @@
 import re
 import unicodedata
 
-from transformers import AutoTokenizer
+from . import bert_registry
 
 from . import punctuation, symbols
 
@@ -92,10 +92,10 @@ def distribute_phone(n_phone, n_word):
 # tokenizer = AutoTokenizer.from_pretrained('cl-tohoku/bert-base-japanese-v3')
 
 model_id = 'kykim/bert-kor-base'
-tokenizer = AutoTokenizer.from_pretrained(model_id)
 
-def g2p(norm_text):
-    tokenized = tokenizer.tokenize(norm_text)
+def g2p(norm_text, tokenized=None):
+    if tokenized is None:
+        tokenized = bert_registry.get_tokenizer(model_id).tokenize(norm_text)
     phs = []
     ph_groups = []
     for t in tokenized:
@@ -142,6 +142,14 @@ def get_bert_feature(text, word2ph, device='cuda'):
     from . import japanese_bert
     return japanese_bert.get_bert_feature(text, word2ph, device=device, model_id=model_id)
 
+def get_bert_feature_batch(texts, word2phs, device='cuda'):
+    from . import japanese_bert
+    return japanese_bert.get_bert_feature_batch(texts, word2phs, device=device, model_id=model_id)
+
+def get_bert_token_feature_batch(texts, device='cuda', backend='torch', token_ids=None):
+    from . import japanese_bert
+    return japanese_bert.get_bert_token_feature_batch(texts, device=device, model_id=model_id, backend=backend, token_ids=token_ids)
+
 
 if __name__ == "__main__":
     # tokenizer = AutoTokenizer.from_pretrained("./bert/bert-base-japanese-v3")
@@ -7,10 +7,9 @@ import subprocess
 import numpy as np
 from scipy.io.wavfile import read
 import torch
-import torchaudio
-import librosa
-from melo.text import cleaned_text_to_sequence, get_bert
-from melo.text.cleaner import clean_text
+from melo.text import cleaned_text_to_sequence, get_bert_token_batch, language_bert_model_id_map
+from melo.text.cleaner import front_end, normalize_text
+from melo.cache import make_key
 from melo import commons
 
 MATPLOTLIB_FLAG = False
@@ -19,43 +18,88 @@ logger = logging.getLogger(__name__)
 
 
 
-def get_text_for_tts_infer(text, language_str, hps, device, symbol_to_id=None):
-    norm_text, phone, tone, word2ph = clean_text(text, language_str)
-    phone, tone, language = cleaned_text_to_sequence(phone, tone, language_str, symbol_to_id)
+def get_text_for_tts_infer(text, language_str, hps, device, symbol_to_id=None, cache=None):
+    """Inference features of one sentence, (bert, ja_bert, phones, tones, lang_ids, word2ph).
 
-    if hps.data.add_blank:
-        phone = commons.intersperse(phone, 0)
-        tone = commons.intersperse(tone, 0)
-        language = commons.intersperse(language, 0)
-        for i in range(len(word2ph)):
-            word2ph[i] = word2ph[i] * 2
-        word2ph[0] += 1
+    The BERT features are token-level, [1024, n_tokens] for ZH in `bert` and [768, n_tokens]
+    for the other languages in `ja_bert`, the unused one is None, and so are both with
+    `disable_bert`. `word2ph` holds the number of phones of each token, the model projects
+    the tokens first and expands them to phones with `TextEncoder.project_bert`.
+    """
+    return get_text_for_tts_infer_batch([text], language_str, hps, device, symbol_to_id, cache)[0]
+
+
+def get_text_for_tts_infer_batch(texts, language_str, hps, device, symbol_to_id=None, cache=None):
+    """`get_text_for_tts_infer` of several sentences. The sentences missing from `cache` go
+    through BERT together, in a single padded forward."""
+    features = [None] * len(texts)
+    keys = [None] * len(texts)
+    if cache is not None:
+        # the features only depend on the normalized sentence, the symbol table, the blank
+        # interspersing and the BERT model, so identical sentences are served from the cache
+        symbols = make_key(sorted(symbol_to_id.items())) if symbol_to_id else make_key(None)
+        for i, text in enumerate(texts):
+            keys[i] = make_key(
+                'token_bert',
+                language_str,
+                normalize_text(text, language_str),
+                symbols,
+                language_bert_model_id_map[language_str],
+                getattr(hps.data, "bert_backend", "torch"),
+                hps.data.add_blank,
+                getattr(hps.data, "disable_bert", False),
+            )
+            features[i] = cache.get(keys[i])
+    missing = [i for i, f in enumerate(features) if f is None]
+    if not missing:
+        return features
+
+    sequences = []
+    for i in missing:
+        norm_text, phone, tone, word2ph, token_ids = front_end(texts[i], language_str)
+        phone, tone, language = cleaned_text_to_sequence(phone, tone, language_str, symbol_to_id)
+
+        if hps.data.add_blank:
+            phone = commons.intersperse(phone, 0)
+            tone = commons.intersperse(tone, 0)
+            language = commons.intersperse(language, 0)
+            for j in range(len(word2ph)):
+                word2ph[j] = word2ph[j] * 2
+            word2ph[0] += 1
+        sequences.append((norm_text, phone, tone, language, word2ph, token_ids))
 
     if getattr(hps.data, "disable_bert", False):
-        bert = torch.zeros(1024, len(phone))
-        ja_bert = torch.zeros(768, len(phone))
+        berts = [None] * len(sequences)
     else:
-        bert = get_bert(norm_text, word2ph, language_str, device)
-        del word2ph
-        assert bert.shape[-1] == len(phone), phone
-
-        if language_str == "ZH":
-            bert = bert
-            ja_bert = torch.zeros(768, len(phone))
-        elif language_str in ["JP", "EN", "ZH_MIX_EN", 'KR', 'SP', 'ES', 'FR', 'DE', 'RU']:
-            ja_bert = bert
-            bert = torch.zeros(1024, len(phone))
-        else:
-            raise NotImplementedError()
-
-    assert bert.shape[-1] == len(
-        phone
-    ), f"Bert seq len {bert.shape[-1]} != {len(phone)}"
-
-    phone = torch.LongTensor(phone)
-    tone = torch.LongTensor(tone)
-    language = torch.LongTensor(language)
-    return bert, ja_bert, phone, tone, language
+        backend = getattr(hps.data, "bert_backend", "torch")
+        # the token ids of the g2p are reused, for the languages whose g2p is tokenized
+        token_ids = [s[5] for s in sequences]
+        token_ids = None if token_ids[0] is None else token_ids
+        berts = get_bert_token_batch([s[0] for s in sequences], language_str, device, backend=backend, token_ids=token_ids)
+
+    for i, (norm_text, phone, tone, language, word2ph, _), bert in zip(missing, sequences, berts):
+        assert sum(word2ph) == len(phone), phone
+        ja_bert = None
+        if bert is not None:
+            if language_str == "ZH":
+                bert = bert[:, :len(word2ph)]
+            elif language_str in ["JP", "EN", "ZH_MIX_EN", 'KR', 'SP', 'ES', 'FR', 'DE', 'RU']:
+                # holds by construction for the languages `front_end` tokenizes once for g2p and BERT
+                assert bert.shape[-1] == len(word2ph), f"Bert seq len {bert.shape[-1]} != {len(word2ph)}"
+                ja_bert = bert
+                bert = None
+            else:
+                raise NotImplementedError()
+
+        phone = torch.LongTensor(phone)
+        tone = torch.LongTensor(tone)
+        language = torch.LongTensor(language)
+        word2ph = torch.LongTensor(word2ph)
+        features[i] = (bert, ja_bert, phone, tone, language, word2ph)
+        if cache is not None:
+            cache.put(keys[i], features[i])
+    return features
+
 
 def load_checkpoint(checkpoint_path, model, optimizer=None, skip_optimizer=False):
     assert os.path.isfile(checkpoint_path)
@@ -226,11 +270,13 @@ def load_wav_to_torch(full_path):
 
 
 def load_wav_to_torch_new(full_path):
+    import torchaudio
     audio_norm, sampling_rate = torchaudio.load(full_path, frame_offset=0, num_frames=-1, normalize=True, channels_first=True)
     audio_norm = audio_norm.mean(dim=0)
     return audio_norm, sampling_rate
 
 def load_wav_to_torch_librosa(full_path, sr):
+    import librosa
     audio_norm, sampling_rate = librosa.load(full_path, sr=sr, mono=True)
     return torch.FloatTensor(audio_norm.astype(np.float32)), sampling_rate
 
@@ -27,6 +27,10 @@ setup(
     packages=find_packages(),
     include_package_data=True,
     install_requires=reqs,
+    extras_require={
+        'server': ['fastapi', 'uvicorn[standard]'],
+        'onnx': ['onnx', 'onnxruntime'],
+    },
     package_data={
         '': ['*.txt', 'cmudict_*'],
     },
@@ -35,6 +39,9 @@ setup(
             "melotts = melo.main:main",
             "melo = melo.main:main",
             "melo-ui = melo.app:main",
+            "melo-server = melo.server:main",
+            "melo-export-onnx = melo.onnx_utils:main",
+            "melo-export-slim = melo.export_slim:main",
         ],
     },
 )
@@ -0,0 +1,59 @@
+import time
+import click
+import torch
+from melo.api import TTS
+from melo.text.bert_backends import BACKENDS
+from benchmark_tts import RESOURCES, load_texts
+
+
+def phone_level_bert(features):
+    """Phone-level BERT features [hidden, n_phones] of one sentence, as the text encoder sees them."""
+    bert, ja_bert, _, _, _, word2ph = features
+    bert = bert if bert is not None else ja_bert
+    return bert.float().repeat_interleave(word2ph, dim=1)
+
+
+def feature_error(reference, features):
+    """Relative L2 error and lowest per-phone cosine similarity of `features` against `reference`."""
+    errors, cosines = [], []
+    for a, b in zip(reference, features):
+        a, b = phone_level_bert(a), phone_level_bert(b)
+        errors.append(((a - b).norm() / a.norm()).item())
+        cosines.append(torch.nn.functional.cosine_similarity(a, b, dim=0).min().item())
+    return max(errors), min(cosines)
+
+
+def rtf(model, texts, speaker_id):
+    start = time.perf_counter()
+    duration = 0.
+    for text in texts:
+        duration += len(model.tts_to_file(text, speaker_id, quiet=True)) / model.hps.data.sampling_rate
+    return (time.perf_counter() - start) / duration
+
+
+@click.command()
+@click.option('--language', '-l', multiple=True, default=list(RESOURCES.keys()), type=click.Choice(list(RESOURCES.keys())))
+@click.option('--backend', '-b', multiple=True, default=BACKENDS[1:], type=click.Choice(BACKENDS[1:]))
+@click.option('--tolerance', '-t', type=float, default=0.1, help="Largest relative L2 error of the phone-level features")
+@click.option('--n_sentences', '-n', type=int, default=20, help="Sentences timed end to end")
+def main(language, backend, tolerance, n_sentences):
+    for lang in language:
+        texts = load_texts(lang)
+        fp32 = TTS(language=lang, device='cpu')
+        speaker_id = list(fp32.hps.data.spk2id.values())[0]
+        reference = fp32.get_text_features_batch(texts)
+        rtf(fp32, texts[:1], speaker_id)
+        print(f'{lang}: torch RTF {rtf(fp32, texts[:n_sentences], speaker_id):.3f}')
+        for b in backend:
+            model = TTS(language=lang, device='cpu', bert_backend=b)
+            error, cosine = feature_error(reference, model.get_text_features_batch(texts))
+            # warm up, this exports the ONNX graph on first use
+            rtf(model, texts[:1], speaker_id)
+            print(f'{lang}: {b} RTF {rtf(model, texts[:n_sentences], speaker_id):.3f}, '
+                  f'feature error {error:.4f}, min cosine similarity {cosine:.4f}')
+            assert error <= tolerance, f'{lang} {b}: feature error {error:.4f} exceeds {tolerance}'
+            model.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+import click
+import torch.nn.functional as F
+from melo.api import TTS
+from benchmark_tts import RESOURCES, load_texts
+from benchmark_quantization import synthesize, mel
+
+
+@click.command()
+@click.option('--language', '-l', multiple=True, default=list(RESOURCES.keys()), type=click.Choice(list(RESOURCES.keys())))
+@click.option('--dtype', '-d', default='bf16', type=click.Choice(['bf16', 'fp16']))
+@click.option('--seed', '-s', type=int, default=0)
+def main(language, dtype, seed):
+    for lang in language:
+        texts = load_texts(lang)
+        fp32 = TTS(language=lang, device='cpu')
+        reduced = TTS(language=lang, device='cpu', dtype=dtype)
+        speaker_id = list(fp32.hps.data.spk2id.values())[0]
+        features = [fp32.get_text_features(t) for t in texts]
+
+        # warm up both models
+        for model in [fp32, reduced]:
+            model.infer_batch(features[:1], [speaker_id])
+
+        fp32_audio, fp32_rtf = synthesize(fp32, features, speaker_id, seed)
+        reduced_audio, reduced_rtf = synthesize(reduced, features, speaker_id, seed)
+        # reduced precision in the text encoder can shift a duration by a frame, the
+        # distance is computed over the common length
+        distance, n_changed = 0., 0
+        for a, b in zip(fp32_audio, reduced_audio):
+            n_changed += len(a) != len(b)
+            length = min(len(a), len(b))
+            distance += F.l1_loss(mel(fp32, a[:length]), mel(reduced, b[:length])).item()
+        distance /= len(features)
+        print(f'{lang}: fp32 RTF {fp32_rtf:.3f}, {dtype} RTF {reduced_rtf:.3f} ({fp32_rtf / reduced_rtf:.2f}x), '
+              f'mel L1 distance {distance:.4f}, {n_changed}/{len(features)} sentences changed length')
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+import time
+import click
+import torch
+import torch.nn.functional as F
+from melo.api import TTS
+from melo.mel_processing import mel_spectrogram_torch
+from benchmark_tts import RESOURCES, load_texts
+
+
+def synthesize(model, features, speaker_id, seed):
+    """Synthesize every sentence with a fixed seed, return the waveforms and the real-time factor."""
+    audio_list, elapsed = [], 0.
+    for i, f in enumerate(features):
+        start = time.perf_counter()
+        audio, = model.infer_batch([f], [speaker_id], generator=torch.Generator().manual_seed(seed + i))
+        elapsed += time.perf_counter() - start
+        audio_list.append(audio)
+    duration = sum(len(audio) for audio in audio_list) / model.hps.data.sampling_rate
+    return audio_list, elapsed / duration
+
+
+def mel(model, audio):
+    data = model.hps.data
+    return mel_spectrogram_torch(
+        torch.from_numpy(audio)[None], data.filter_length, data.n_mel_channels, data.sampling_rate,
+        data.hop_length, data.win_length, data.mel_fmin, data.mel_fmax,
+    )
+
+
+@click.command()
+@click.option('--language', '-l', multiple=True, default=list(RESOURCES.keys()), type=click.Choice(list(RESOURCES.keys())))
+@click.option('--n_calibration', '-c', type=int, default=32, help="Sentences used to calibrate, at most half of a language's sentences, the rest are evaluated")
+@click.option('--seed', '-s', type=int, default=0)
+def main(language, n_calibration, seed):
+    for lang in language:
+        texts = load_texts(lang)
+        # the smaller resources only have a handful of sentences, keep half of them held out
+        n = min(n_calibration, len(texts) // 2)
+        if n == 0:
+            print(f'{lang}: skipped, {len(texts)} sentence(s) are too few to calibrate and evaluate')
+            continue
+        calibration_texts, eval_texts = texts[:n], texts[n:]
+        fp32 = TTS(language=lang, device='cpu')
+        int8 = TTS(language=lang, device='cpu', quantize='int8', calibration_texts=calibration_texts)
+        speaker_id = list(fp32.hps.data.spk2id.values())[0]
+        features = [fp32.get_text_features(t) for t in eval_texts]
+
+        # warm up both models
+        for model in [fp32, int8]:
+            model.infer_batch(features[:1], [speaker_id])
+
+        fp32_audio, fp32_rtf = synthesize(fp32, features, speaker_id, seed)
+        int8_audio, int8_rtf = synthesize(int8, features, speaker_id, seed)
+        # with the same seed the durations match, so the waveforms are aligned frame by frame
+        distance = sum(F.l1_loss(mel(fp32, a), mel(int8, b)).item() for a, b in zip(fp32_audio, int8_audio)) / len(features)
+        print(f'{lang}: fp32 RTF {fp32_rtf:.3f}, int8 RTF {int8_rtf:.3f} ({fp32_rtf / int8_rtf:.2f}x), mel L1 distance {distance:.4f}')
+
+
+if __name__ == "__main__":
+    main()
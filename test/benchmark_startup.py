@@ -0,0 +1,44 @@
+import sys
+import time
+import resource
+import subprocess
+import click
+
+
+def load(language, ckpt_path, config_path, use_meta):
+    """Time checkpoint loading and model construction, report the peak RSS of the process."""
+    from melo.api import TTS
+    from melo.download_utils import load_or_download_config, load_or_download_model
+
+    hps = load_or_download_config(language, config_path=config_path)
+    start = time.perf_counter()
+    checkpoint_dict = load_or_download_model(language, 'cpu', ckpt_path=ckpt_path)
+    state_dict = checkpoint_dict['model']
+    inference_only = checkpoint_dict.get('inference_only', False)
+    TTS.build_model(hps, state_dict, 'cpu', inference_only=inference_only, use_meta=use_meta)
+    elapsed = time.perf_counter() - start
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f'use_meta={use_meta}: {elapsed:.3f}s to load and build, peak RSS {peak_rss:.0f}MB')
+
+
+@click.command()
+@click.option('--language', '-l', default='EN')
+@click.option('--ckpt_path', '-c', default=None, help='Checkpoint, .pth or slim .safetensors, downloaded if not given')
+@click.option('--config_path', default=None)
+@click.option('--use_meta', type=click.Choice(['both', 'yes', 'no']), default='both')
+def main(language, ckpt_path, config_path, use_meta):
+    if use_meta != 'both':
+        load(language, ckpt_path, config_path, use_meta == 'yes')
+        return
+    # every configuration runs in its own process so that the peak RSS is its own
+    for flag in ['no', 'yes']:
+        args = [sys.executable, __file__, '--language', language, '--use_meta', flag]
+        if ckpt_path is not None:
+            args += ['--ckpt_path', ckpt_path]
+        if config_path is not None:
+            args += ['--config_path', config_path]
+        subprocess.run(args, check=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+import os
+import time
+import click
+from melo.api import TTS
+
+RESOURCES = {
+    'EN': 'en_egs_text.txt',
+    'ES': 'es_egs_text.txt',
+    'FR': 'fr_egs_text.txt',
+    'ZH': 'zh_mix_en_egs_text.txt',
+    'JP': 'jp_egs_text.txt',
+    'KR': 'kr_egs_text.txt',
+}
+
+
+def load_texts(language):
+    path = os.path.join(os.path.dirname(__file__), 'basetts_test_resources', RESOURCES[language])
+    with open(path) as f:
+        return [line.strip() for line in f if line.strip()]
+
+
+@click.command()
+@click.option('--language', '-l', default='EN', type=click.Choice(list(RESOURCES.keys())))
+@click.option('--device', '-d', default='cpu')
+@click.option('--batch_size', '-b', type=int, default=8, help="Batch size compared against sequential inference")
+@click.option('--pipeline_depth', '-p', type=int, default=2, help="Front-end prefetch depth compared against the unpipelined run")
+@click.option('--repeat', '-r', type=int, default=3)
+@click.option('--n_short', '-s', type=int, default=20, help="Number of short sentences timed with and without the speaker conditioning cache")
+@click.option('--compile', 'compile_', is_flag=True, help="Benchmark the torch.compile inference mode")
+def main(language, device, batch_size, pipeline_depth, repeat, n_short, compile_):
+    model = TTS(language=language, device=device, compile=compile_, optimize=False)
+    speaker_id = list(model.hps.data.spk2id.values())[0]
+    texts = load_texts(language)
+    text = ' '.join(texts)
+    sentences = model.split_sentences_into_pieces(text, model.language, quiet=True)
+    n_sentences = len(sentences)
+
+    # warm up BERT and the acoustic model, with --compile this compiles the graph of every
+    # phone and frame bucket the timed runs reach, with a margin for the sampled durations
+    start = time.perf_counter()
+    model.tts_to_file(texts[0], speaker_id, quiet=True)
+    if compile_:
+        features = model.get_text_features_batch(sentences)
+        max_frames = max(len(model.infer_batch([f], [speaker_id])[0]) for f in features) // model.hps.data.hop_length
+        model.warm_up(
+            max_phones=max(f[2].size(0) for f in features),
+            max_frames=int(1.5 * max_frames),
+            batch_sizes=(1, batch_size),
+        )
+    print(f'warm-up: {time.perf_counter() - start:.3f}s')
+
+    for bs, depth in [(1, 0), (batch_size, 0), (1, pipeline_depth)]:
+        start = time.perf_counter()
+        for _ in range(repeat):
+            model.tts_to_file(text, speaker_id, quiet=True, batch_size=bs, pipeline_depth=depth)
+        elapsed = (time.perf_counter() - start) / repeat
+        print(f'batch_size={bs} pipeline_depth={depth}: {elapsed:.3f}s per paragraph, {n_sentences / elapsed:.2f} sentences/sec')
+
+    if compile_:
+        # the sections below change the modules, which would recompile inside the timed loops
+        return
+
+    # the per-speaker conditioning is a fixed cost per call, largest relative to short sentences
+    features = [model.get_text_features(t) for t in sorted(sentences, key=len)[:n_short]]
+    for cached in [True, False]:
+        if not cached:
+            model.model.clear_speaker_conditioning()
+        start = time.perf_counter()
+        for _ in range(repeat):
+            for f in features:
+                model.infer_batch([f], [speaker_id])
+        elapsed = (time.perf_counter() - start) / (repeat * len(features))
+        print(f'speaker conditioning cache={cached}: {elapsed * 1000:.1f}ms per short sentence')
+    model.model.cache_speaker_conditioning(model.hps.data.spk2id.values())
+
+    # folding weight norm, dropping the posterior encoder and skipping unweighted predictors
+    for optimized in [False, True]:
+        if optimized:
+            before, after = model.model.optimize_for_inference(drop_posterior_encoder=True)
+            print(f'optimize_for_inference: parameters {before / 2 ** 20:.1f}MB -> {after / 2 ** 20:.1f}MB')
+        for sdp_ratio in [0., 0.2]:
+            start = time.perf_counter()
+            for _ in range(repeat):
+                for f in features:
+                    model.infer_batch([f], [speaker_id], sdp_ratio=sdp_ratio)
+            elapsed = (time.perf_counter() - start) / (repeat * len(features))
+            print(f'optimized={optimized} sdp_ratio={sdp_ratio}: {elapsed * 1000:.1f}ms per short sentence')
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+import json
+import time
+import click
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+TEXT = "Did you ever hear a folk tale about a giant turtle? Can you name five cars that were popular in the 1970s?"
+
+
+def request_once(url, language, text):
+    body = json.dumps({'text': text, 'language': language, 'format': 'pcm'}).encode()
+    req = urllib.request.Request(url, data=body, headers={'Content-Type': 'application/json'})
+    start = time.perf_counter()
+    first_chunk = None
+    n_bytes = 0
+    with urllib.request.urlopen(req) as response:
+        while True:
+            chunk = response.read1(65536)
+            if not chunk:
+                break
+            if first_chunk is None:
+                first_chunk = time.perf_counter() - start
+            n_bytes += len(chunk)
+    return first_chunk, time.perf_counter() - start, n_bytes
+
+
+@click.command()
+@click.option('--url', default='http://127.0.0.1:8000/tts')
+@click.option('--language', '-l', default='EN')
+@click.option('--concurrency', '-c', type=int, default=4)
+@click.option('--requests', '-n', 'n_requests', type=int, default=32)
+def main(url, language, concurrency, n_requests):
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(lambda _: request_once(url, language, TEXT), range(n_requests)))
+    elapsed = time.perf_counter() - start
+    first = sorted(r[0] for r in results)
+    total = sorted(r[1] for r in results)
+    print(f'{n_requests} requests in {elapsed:.2f}s ({n_requests / elapsed:.2f} req/s), concurrency {concurrency}')
+    print(f'time to first audio: p50 {first[len(first) // 2]:.3f}s, p95 {first[int(len(first) * 0.95) - 1]:.3f}s')
+    print(f'total latency:       p50 {total[len(total) // 2]:.3f}s, p95 {total[int(len(total) * 0.95) - 1]:.3f}s')
+
+
+if __name__ == "__main__":
+    main()
@@ -2,6 +2,7 @@ from melo.api import TTS
 import os
 import glob
 import sys
+import soundfile
 
 
 language = sys.argv[1]
@@ -36,8 +37,9 @@ else:
 save_dir = os.path.join('basetts_outputs_package_from_S3', root_folder.split('/')[-1])
 
 for speed in [1.0]:
-    for speaker in speakers:
-        for sent_id, text in enumerate(texts):
+    for sent_id, text in enumerate(texts):
+        audios = model.tts_multi_speaker(text, [speaker_ids[speaker] for speaker in speakers], speed=speed)
+        for speaker, audio in zip(speakers, audios):
             output_path = f'{save_dir}/{speaker}/speed_{speed}/sent_{sent_id:03d}.wav'
             os.makedirs(os.path.dirname(output_path), exist_ok=True)
-            model.tts_to_file(text, speaker_ids[speaker], output_path, speed=speed)
\ No newline at end of file
+            soundfile.write(output_path, audio, model.hps.data.sampling_rate)
\ No newline at end of file